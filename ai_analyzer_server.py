@@ -1,11 +1,19 @@
 import os
+import hmac
 import json
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import Optional, List, Literal
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, constr
-from openai import OpenAI
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field, ValidationError, constr
+
+import metrics
+import screener
 
 # ---------- Config ----------
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -13,14 +21,69 @@ if not OPENAI_API_KEY:
     raise RuntimeError("Missing OPENAI_API_KEY env var.")
 
 MODEL_NAME = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+# Set OPENAI_WARM_UP=0 to skip the background warm-up after startup
+WARM_UP = os.getenv("OPENAI_WARM_UP", "1") != "0"
+# POST /analyze/batch: tickers per Responses call (default), and the hard cap for a request's pack_size
+ANALYZE_PACK_SIZE = int(os.getenv("ANALYZE_PACK_SIZE", "5"))
+MAX_PACK_SIZE = 20
+MAX_BATCH_TICKERS = 500
+# GET /screen is fed by run_quant: pushed to POST /screen/push (needs SCREEN_PUSH_TOKEN, the
+# same value run_quant uses), and/or read from a history archive + state file on a shared disk
+SCREEN_PUSH_TOKEN = os.getenv("SCREEN_PUSH_TOKEN")
+QUANT_ARCHIVE_FILE = os.getenv("QUANT_ARCHIVE_FILE", screener.ARCHIVE_FILE)
+QUANT_STATE_FILE = os.getenv("QUANT_STATE_FILE", screener.QUANT_STATE_FILE)
+SCREEN_REFRESH_SECONDS = float(os.getenv("SCREEN_REFRESH_SECONDS", str(screener.REFRESH_SECONDS)))
+
+# The openai package is about half of this module's import time, so the client
+# is built on first use (or by warm_up() right after the server binds).
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=OPENAI_API_KEY)
+    return _client
+
+
+_screener = screener.Screener(QUANT_ARCHIVE_FILE, QUANT_STATE_FILE, SCREEN_REFRESH_SECONDS)
+
+
+def warm_up():
+    """
+    Pay the first-request costs in the background: response schema build,
+    screener index load, openai import + client construction, and the TLS
+    connection to the API.
+    """
+    t0 = time.perf_counter()
+    build_json_schema_for_response()
+    build_json_schema_for_batch()
+    _screener.maybe_refresh()
+    try:
+        with metrics.span("openai", "warm_up"):
+            get_client().with_options(timeout=10, max_retries=0).models.retrieve(MODEL_NAME)
+    except Exception as e:
+        print(f"Warm-up: OpenAI connection check failed: {e}")
+    print(f"Warm-up done in {time.perf_counter() - t0:.2f}s")
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    if WARM_UP:
+        threading.Thread(target=warm_up, name="openai-warm-up", daemon=True).start()
+    yield
 
-client = OpenAI(api_key=OPENAI_API_KEY)
 
 # ---------- FastAPI ----------
 app = FastAPI(
     title="AI Analyzer Server",
     version="1.0.0",
     description="Simple, stable FastAPI wrapper using OpenAI Responses API (OpenAI() client).",
+    lifespan=lifespan,
 )
 
 # CORS (adjust origins for production if you want)
@@ -33,6 +96,26 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Per-route latency histogram, exposed on GET /metrics."""
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.observe(
+            "stockron_http_request_seconds",
+            time.perf_counter() - t0,
+            method=request.method,
+            path=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+
+
 # ---------- Models ----------
 Timeframe = Literal["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "ytd", "max"]
 
@@ -71,13 +154,114 @@ class AnalyzeResponse(BaseModel):
     chart_base64: Optional[str] = None  # Keep field for compatibility (can be filled elsewhere)
 
 
+class AnalyzeBatchRequest(BaseModel):
+    requests: List[AnalyzeRequest] = Field(..., min_length=1, max_length=MAX_BATCH_TICKERS)
+    pack_size: Optional[int] = Field(None, ge=1, le=MAX_PACK_SIZE,
+                                     description="Tickers per model call (default ANALYZE_PACK_SIZE)")
+
+
+class TickerAnalysis(BaseModel):
+    """One entry of the packed model output."""
+    ticker: str
+    analysis: AnalyzeResponse
+
+
+class AnalyzeBatchOutput(BaseModel):
+    """Schema the model fills for a pack of tickers."""
+    results: List[TickerAnalysis]
+
+
+class AnalyzeBatchItem(BaseModel):
+    ticker: str
+    result: Optional[AnalyzeResponse] = None
+    error: Optional[str] = None
+    packed: bool = Field(False, description="True if answered by a packed call, False if by the per-ticker fallback")
+
+
+class AnalyzeBatchResponse(BaseModel):
+    results: List[AnalyzeBatchItem]
+    model_calls: int
+
+
+class ScreenRow(BaseModel):
+    rank: int = Field(..., description="Position by Total_Score across the whole universe")
+    symbol: str
+    name: Optional[str] = None
+    sector: str
+    industry: Optional[str] = None
+    price: Optional[float] = None
+    total_score: Optional[float] = None
+    score_value: Optional[float] = None
+    score_growth: Optional[float] = None
+    score_tech: Optional[float] = None
+    pe_z: Optional[float] = None
+    ps_z: Optional[float] = None
+    pb_z: Optional[float] = None
+    peg: Optional[float] = None
+    peg_flag: Optional[str] = None
+    scored_at: Optional[str] = None
+
+
+class ScreenPush(BaseModel):
+    rows: List[dict] = Field(default_factory=list, description="QuantAnalysis rows keyed by header")
+    universe: Optional[List[str]] = Field(None, description="All current symbols; others are dropped")
+
+
+class ScreenPushResponse(BaseModel):
+    received: int
+    universe: int
+    needs_full: bool
+
+
+class ScreenResponse(BaseModel):
+    count: int
+    universe: int
+    as_of: Optional[float] = Field(None, description="Epoch of the latest quant round in the index")
+    results: List[ScreenRow]
+
+
 # ---------- Helpers ----------
+def strict_json_schema(schema: dict) -> dict:
+    """
+    Make a Pydantic JSON schema acceptable to OpenAI's strict structured outputs:
+    every object gets additionalProperties: false and lists all its properties
+    as required; optional properties must allow null instead, and "default" is
+    not supported. Applied in place, recursively (including $defs).
+    """
+    schema.pop("default", None)
+    props = schema.get("properties")
+    if schema.get("type") == "object" and isinstance(props, dict):
+        required = set(schema.get("required", []))
+        for key, prop in props.items():
+            if key not in required and not _allows_null(prop):
+                props[key] = {"anyOf": [prop, {"type": "null"}]}
+        schema["required"] = list(props)
+        schema["additionalProperties"] = False
+
+    for key in ("properties", "$defs"):
+        for sub in schema.get(key, {}).values():
+            strict_json_schema(sub)
+    for key in ("anyOf", "allOf", "oneOf"):
+        for sub in schema.get(key, []):
+            strict_json_schema(sub)
+    if isinstance(schema.get("items"), dict):
+        strict_json_schema(schema["items"])
+    return schema
+
+
+def _allows_null(prop: dict) -> bool:
+    if prop.get("type") == "null":
+        return True
+    return any(isinstance(p, dict) and p.get("type") == "null" for p in prop.get("anyOf", []))
+
+
+@lru_cache(maxsize=None)
 def build_json_schema_for_response():
     """
     Use OpenAI Responses JSON schema to enforce a clean shape from the model.
     """
-    # Convert our Pydantic schema to JSON Schema
-    schema = AnalyzeResponse.model_json_schema()
+    # Convert our Pydantic schema to JSON Schema (strict mode needs the tweaks above)
+    schema = strict_json_schema(AnalyzeResponse.model_json_schema())
     # OpenAI requires a top-level "name" and "schema" with "strict": True preferred
     return {
         "name": "analyze_response",
@@ -86,6 +270,16 @@ def build_json_schema_for_response():
     }
 
 
+@lru_cache(maxsize=None)
+def build_json_schema_for_batch():
+    """Same as above for a pack of tickers: {"results": [{"ticker", "analysis": AnalyzeResponse}]}."""
+    return {
+        "name": "analyze_batch_response",
+        "strict": True,
+        "schema": strict_json_schema(AnalyzeBatchOutput.model_json_schema()),
+    }
+
+
 SYSTEM_PROMPT = """You are a precise, cautious financial analysis assistant.
 - ALWAYS return valid JSON that matches the provided JSON schema.
 - If you are not certain about real-time numeric values (price, volume, market cap), leave them null.
@@ -96,7 +290,7 @@ SYSTEM_PROMPT = """You are a precise, cautious financial analysis assistant.
 """
 
 
-def build_user_prompt(req: AnalyzeRequest) -> str:
+def _request_lines(req: AnalyzeRequest) -> List[str]:
     lines = [
         f"Ticker: {req.ticker}",
         f"Timeframe: {req.timeframe}",
@@ -104,6 +298,11 @@ def build_user_prompt(req: AnalyzeRequest) -> str:
     ]
     if req.notes:
         lines.append(f"Notes: {req.notes}")
+    return lines
+
+
+def build_user_prompt(req: AnalyzeRequest) -> str:
+    lines = _request_lines(req)
     lines.append(
         "\nReturn ONLY the JSON object as per schema. If a field is unknown, use null. "
         "Do not invent exact prices or volumes."
@@ -111,6 +310,35 @@ def build_user_prompt(req: AnalyzeRequest) -> str:
     return "\n".join(lines)
 
 
+def build_batch_user_prompt(reqs: List[AnalyzeRequest]) -> str:
+    """One prompt for a pack of tickers; the system prompt and schema are sent once for all of them."""
+    blocks = [f"Analyze each of the following {len(reqs)} tickers independently."]
+    blocks += ["\n".join(_request_lines(req)) for req in reqs]
+    blocks.append(
+        "Return ONLY the JSON object as per schema: one entry in 'results' per ticker above, in the same order, "
+        "with 'ticker' exactly as given and 'analysis' holding that ticker's analysis. "
+        "If a field is unknown, use null. Do not invent exact prices or volumes."
+    )
+    return "\n\n".join(blocks)
+
+
+def pack_requests(reqs: List[AnalyzeRequest], pack_size: int) -> List[List[int]]:
+    """
+    Split request indexes into packs of up to pack_size. A ticker appears at most
+    once per pack (a repeat goes to a later pack) so results can be matched back by ticker.
+    """
+    packs = []
+    for i, req in enumerate(reqs):
+        key = req.ticker.upper()
+        for pack in packs:
+            if len(pack) < pack_size and all(reqs[j].ticker.upper() != key for j in pack):
+                pack.append(i)
+                break
+        else:
+            packs.append([i])
+    return packs
+
+
 # ---------- Routes ----------
 @app.get("/", tags=["meta"])
 def index():
@@ -126,7 +354,17 @@ def index():
                     "notes": "Focus on AI catalysts."
                 }
             },
-            "GET /healthz": {}
+            "POST /analyze/batch": {
+                "body": {
+                    "requests": [{"ticker": "NVDA"}, {"ticker": "AAPL", "timeframe": "1y"}],
+                    "pack_size": ANALYZE_PACK_SIZE
+                }
+            },
+            "GET /screen": {
+                "query": {"k": 20, "sector": "Technology", "min_score": 6, "max_score": 9, "peg": "good,mid"}
+            },
+            "GET /healthz": {},
+            "GET /metrics": {}
         },
         "notes": "Call POST /analyze. GET on /analyze will return 405 (Method Not Allowed).",
         "sdk": "OpenAI Responses API via OpenAI() client",
@@ -139,21 +377,64 @@ def healthz():
     return {"ok": True}
 
 
-@app.post("/analyze", response_model=AnalyzeResponse, tags=["analyze"])
-def analyze(req: AnalyzeRequest):
+@app.get("/metrics", tags=["meta"], response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus text exposition of request, OpenAI latency and token metrics."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/screen", response_model=ScreenResponse, tags=["screen"])
+def screen(
+    k: int = Query(screener.DEFAULT_TOP_K, ge=1, le=screener.MAX_TOP_K),
+    sector: Optional[str] = Query(None, description="Exact sector name (case-insensitive)"),
+    min_score: Optional[float] = Query(None, ge=0, le=9, description="Lowest Total_Score to include"),
+    max_score: Optional[float] = Query(None, ge=0, le=9, description="Highest Total_Score to include"),
+    peg: Optional[str] = Query(None, description="Comma-separated PEG flags: good, mid, high, na"),
+):
     """
-    Main analysis endpoint.
-    Uses OpenAI Responses API with JSON Schema to guarantee clean JSON output.
+    Top-k symbols by Total_Score from the latest quant run, served from an
+    in-memory ranked index (no Sheets read). The index picks up new quant
+    rounds from the history archive at most every SCREEN_REFRESH_SECONDS.
     """
-    try:
-        schema = build_json_schema_for_response()
+    rows = _screener.screen(k=k, sector=sector, min_score=min_score, max_score=max_score,
+                            peg_flags=screener.parse_peg_flags(peg))
+    return ScreenResponse(count=len(rows), universe=len(_screener.index),
+                          as_of=_screener.as_of, results=rows)
+
 
-        response = client.responses.create(
+@app.post(screener.PUSH_PATH, response_model=ScreenPushResponse, tags=["screen"])
+def screen_push(body: ScreenPush, authorization: Optional[str] = Header(None)):
+    """
+    Called by run_quant after every round (SCREENER_URL + SCREEN_PUSH_TOKEN on its side)
+    with the rescored rows and the current universe. needs_full=True asks it to resend
+    the whole table, e.g. after this server restarted with an empty index.
+    """
+    if not SCREEN_PUSH_TOKEN:
+        raise HTTPException(status_code=403, detail="Screen push is disabled (SCREEN_PUSH_TOKEN not set).")
+    if not hmac.compare_digest(authorization or "", f"Bearer {SCREEN_PUSH_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid push token.")
+    return _screener.apply_push(body.rows, body.universe)
+
+
+def record_usage(response):
+    """Count OpenAI token usage (input/output) from a Responses API result."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    for kind in ("input_tokens", "output_tokens"):
+        value = getattr(usage, kind, None)
+        if value:
+            metrics.inc("stockron_openai_tokens_total", value, model=MODEL_NAME, type=kind.split("_")[0])
+
+
+def call_model(schema: dict, user_prompt: str, op: str = "responses.create") -> dict:
+    """One Responses API call with a JSON schema; returns the parsed JSON object."""
+    with metrics.span("openai", op):
+        response = get_client().responses.create(
             model=MODEL_NAME,
-            # Enforce JSON schema output (Responses API)
-            response_format={
-                "type": "json_schema",
-                "json_schema": schema,
+            # Enforce JSON schema output (Responses API takes it under text.format)
+            text={
+                "format": {"type": "json_schema", **schema},
             },
             # System + user prompts (Responses API prefers "input" content)
             input=[
@@ -163,31 +444,132 @@ def analyze(req: AnalyzeRequest):
                 },
                 {
                     "role": "user",
-                    "content": build_user_prompt(req),
+                    "content": user_prompt,
                 },
             ],
         )
 
-        # Extract the JSON text from the first output
-        content = response.output_text  # Convenient helper for Responses API
-        if not content:
-            raise HTTPException(status_code=502, detail="Empty response from model.")
+    record_usage(response)
+
+    # Extract the JSON text from the first output
+    content = response.output_text  # Convenient helper for Responses API
+    if not content:
+        raise HTTPException(status_code=502, detail="Empty response from model.")
+
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=502, detail=f"Model returned invalid JSON: {e}")
+
 
+def analyze_one(req: AnalyzeRequest) -> AnalyzeResponse:
+    parsed = call_model(build_json_schema_for_response(), build_user_prompt(req))
+    # Validate with Pydantic (gives us nice 422s if off)
+    return AnalyzeResponse.model_validate(parsed)
+
+
+class BatchOutputError(ValueError):
+    """The packed model output is not shaped like {"results": [...]}."""
+
+
+def analyze_pack(reqs: List[AnalyzeRequest]) -> dict:
+    """
+    Analyze a pack of tickers in one model call. Returns {index in reqs: AnalyzeResponse}
+    for every entry that came back valid; missing or invalid entries are simply absent.
+    Raises HTTPException (502) / BatchOutputError when the output as a whole is unusable,
+    and lets transport / API errors from the call itself propagate.
+    """
+    parsed = call_model(build_json_schema_for_batch(), build_batch_user_prompt(reqs), "responses.create.batch")
+    results = parsed.get("results") if isinstance(parsed, dict) else None
+    if not isinstance(results, list):
+        raise BatchOutputError("model output has no 'results' array")
+    wanted = {req.ticker.upper(): i for i, req in enumerate(reqs)}
+    out = {}
+    for raw in results:
         try:
-            parsed = json.loads(content)
-        except json.JSONDecodeError as e:
-            raise HTTPException(status_code=502, detail=f"Model returned invalid JSON: {e}")
+            item = TickerAnalysis.model_validate(raw)
+        except ValidationError:
+            continue
+        i = wanted.get(item.ticker.strip().upper())
+        if i is not None and i not in out:
+            out[i] = item.analysis
+    return out
 
-        # Validate with Pydantic (gives us nice 422s if off)
-        validated = AnalyzeResponse.model_validate(parsed)
-        return validated
 
+def analyze_many(reqs: List[AnalyzeRequest], pack_size: int = ANALYZE_PACK_SIZE) -> AnalyzeBatchResponse:
+    """
+    Analyze many tickers with one model call per pack of pack_size tickers.
+    Only output problems fall back to per-ticker calls (the /analyze path): a pack whose
+    JSON is empty / invalid, or tickers it leaves out or returns invalid. Transport and
+    API errors (timeouts, 429, 5xx) are reported per ticker without fanning out, so an
+    outage or rate limit costs one call per pack, not pack_size + 1.
+    """
+    items = [AnalyzeBatchItem(ticker=req.ticker) for req in reqs]
+    calls = 0
+    for pack in pack_requests(reqs, pack_size):
+        done = {}
+        upstream_error = None
+        if len(pack) > 1:
+            calls += 1
+            try:
+                done = analyze_pack([reqs[i] for i in pack])
+                missing = len(pack) - len(done)
+                if missing:
+                    metrics.inc("stockron_analyze_fallback_total", missing, reason="entry_invalid")
+            except (HTTPException, BatchOutputError) as e:
+                detail = e.detail if isinstance(e, HTTPException) else e
+                print(f"Packed analyze of {len(pack)} tickers returned unusable output, falling back per ticker: {detail}")
+                metrics.inc("stockron_analyze_fallback_total", len(pack), reason="pack_invalid")
+            except Exception as e:
+                upstream_error = e
+        for j, i in enumerate(pack):
+            if j in done:
+                items[i].result, items[i].packed = done[j], True
+                continue
+            if upstream_error is not None:
+                items[i].error = str(upstream_error)
+                continue
+            calls += 1
+            try:
+                items[i].result = analyze_one(reqs[i])
+            except HTTPException as e:
+                items[i].error = str(e.detail)
+            except ValidationError as e:
+                items[i].error = str(e)
+            except Exception as e:
+                # Upstream is failing: don't spend more calls on the rest of this pack
+                upstream_error = e
+                items[i].error = str(e)
+        if upstream_error is not None:
+            metrics.inc("stockron_analyze_upstream_errors_total", reason=type(upstream_error).__name__)
+    return AnalyzeBatchResponse(results=items, model_calls=calls)
+
+
+@app.post("/analyze", response_model=AnalyzeResponse, tags=["analyze"])
+def analyze(req: AnalyzeRequest):
+    """
+    Main analysis endpoint.
+    Uses OpenAI Responses API with JSON Schema to guarantee clean JSON output.
+    """
+    try:
+        return analyze_one(req)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/analyze/batch", response_model=AnalyzeBatchResponse, tags=["analyze"])
+def analyze_batch(req: AnalyzeBatchRequest):
+    """
+    Analyze many tickers, packing pack_size of them into each model call
+    (system prompt and schema are sent once per pack instead of once per ticker).
+    Results come back per ticker in request order; a ticker that could not be
+    analyzed has 'error' set instead of 'result'.
+    """
+    return analyze_many(req.requests, req.pack_size or ANALYZE_PACK_SIZE)
+
+
 # ---------- Dev entry ----------
 if __name__ == "__main__":
     # For local runs: uvicorn ai_analyzer_server:app --reload
@@ -0,0 +1,140 @@
+"""
+Fast-start ASGI entry point for Render: `uvicorn asgi_entry:app`.
+
+Importing this module pulls in nothing heavy, so uvicorn binds and answers
+GET /healthz within a fraction of a second of process start. The real
+FastAPI app (ai_analyzer_server) is imported in the background as soon as
+the server starts, and its own lifespan (warm-up included) is then run, so
+there is a single startup path whichever entry point is used. Any other
+request that arrives before that finishes waits for the import instead of
+failing. If the import or the app's startup fails, /healthz returns 503
+so the deploy health check fails instead of a broken build going live.
+"""
+import asyncio
+import importlib
+import json
+import os
+import threading
+
+TARGET_MODULE = "ai_analyzer_server"
+
+# Fail fast like ai_analyzer_server does, without importing it
+if not os.getenv("OPENAI_API_KEY"):
+    raise RuntimeError("Missing OPENAI_API_KEY env var.")
+
+_HEALTHZ_BODY = json.dumps({"ok": True}).encode()
+
+
+class LazyApp:
+    def __init__(self, target):
+        self.target = target
+        self._app = None
+        self._lock = threading.Lock()
+        self.load_error = None
+        self._lifespan_task = None
+        self._inner_receive = None
+
+    def load(self):
+        """Import the real app (once) and return it; a failed import is remembered and re-raised."""
+        if self._app is None:
+            with self._lock:
+                if self.load_error is not None:
+                    raise self.load_error
+                if self._app is None:
+                    try:
+                        self._app = importlib.import_module(self.target).app
+                    except Exception as e:
+                        self.load_error = e
+                        raise
+        return self._app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(scope, receive, send)
+            return
+        if scope["type"] == "http" and scope["path"] == "/healthz" and scope["method"] in ("GET", "HEAD"):
+            await self._healthz(scope, send)
+            return
+        try:
+            app = self._app or await asyncio.to_thread(self.load)
+        except Exception:
+            if scope["type"] == "http":
+                await self._send_json(scope, send, 503, {"ok": False, "error": self._error_text()})
+            return
+        await app(scope, receive, send)
+
+    # ----- lifespan -----
+    async def _lifespan(self, scope, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._lifespan_task = asyncio.create_task(self._run_inner_lifespan(scope))
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self._shutdown_inner()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _run_inner_lifespan(self, scope):
+        """Load the real app, then drive its lifespan (startup now, shutdown when we shut down)."""
+        try:
+            app = await asyncio.to_thread(self.load)
+        except Exception as e:
+            print(f"Background load of {self.target} failed: {e}")
+            return
+
+        self._inner_receive = asyncio.Queue()
+        await self._inner_receive.put({"type": "lifespan.startup"})
+
+        async def inner_send(message):
+            if message["type"] == "lifespan.startup.failed":
+                self.load_error = RuntimeError(message.get("message") or "startup failed")
+                print(f"Startup of {self.target} failed: {self.load_error}")
+
+        try:
+            await app(scope, self._inner_receive.get, inner_send)
+        except Exception as e:
+            if self.load_error is None:
+                self.load_error = e
+            print(f"Lifespan of {self.target} failed: {e}")
+
+    async def _shutdown_inner(self):
+        task = self._lifespan_task
+        if task is None:
+            return
+        if self._inner_receive is not None and not task.done():
+            await self._inner_receive.put({"type": "lifespan.shutdown"})
+        else:
+            # Still importing: shutting down must not wait for it
+            task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    # ----- /healthz -----
+    def _error_text(self):
+        return f"{type(self.load_error).__name__}: {self.load_error}"
+
+    async def _healthz(self, scope, send):
+        if self.load_error is not None:
+            await self._send_json(scope, send, 503, {"ok": False, "error": self._error_text()})
+            return
+        await self._send_body(scope, send, 200, _HEALTHZ_BODY)
+
+    async def _send_json(self, scope, send, status, payload):
+        await self._send_body(scope, send, status, json.dumps(payload).encode())
+
+    async def _send_body(self, scope, send, status, body):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+
+app = LazyApp(TARGET_MODULE)
@@ -0,0 +1,93 @@
+"""
+Cold start של השרת: דוח import-time (בסגנון -X importtime) וזמן מתחילת התהליך עד ש-/healthz מחזיר 200.
+משווה את asgi_entry:app (טעינה עצלה) ל-ai_analyzer_server:app (טעינה מלאה).
+
+הרצה:  python benchmarks/bench_cold_start.py [--top 15] [--runs 3]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = ["asgi_entry", "ai_analyzer_server"]
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "stub")
+    env["OPENAI_WARM_UP"] = "0"  # בלי רשת – מודדים רק את זמן העלייה עצמו
+    return env
+
+def import_times(module):
+    """[(cumulative_us, self_us, depth, name)] מתוך python -X importtime"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    )
+    out = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cum_us, name = (part for part in [line[:12]] + line[12:].split("|"))
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        out.append((int(cum_us), int(self_us), depth, name.strip()))
+    return out
+
+def report_import_times(module, top):
+    rows = import_times(module)
+    total = next((c for c, _, d, n in rows if n == module and d == 0), None)
+    print(f"\n📦 import {module}: {total / 1000:.1f} ms" if total else f"\n📦 import {module}")
+    # רק המודול עצמו והייבוא הישיר שלו – שם רואים מה כדאי לדחות
+    direct = sorted((r for r in rows if r[2] <= 1), reverse=True)[:top]
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for cum, self_us, depth, name in direct:
+        print(f"{cum / 1000:14.1f} {self_us / 1000:8.1f}  {'  ' * depth}{name}")
+    return total
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def time_to_healthz(module, timeout=30.0):
+    """שניות מ-Popen של uvicorn ועד ש-GET /healthz מחזיר 200"""
+    port = free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - t0
+            except OSError:
+                time.sleep(0.01)
+        return None
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for module in TARGETS:
+        report_import_times(module, args.top)
+
+    print("\n⏱️ זמן עד /healthz (הטוב מבין הריצות):")
+    for module in TARGETS:
+        times = [t for t in (time_to_healthz(module) for _ in range(args.runs)) if t is not None]
+        best = f"{min(times) * 1000:.0f} ms" if times else "timeout"
+        print(f"  {module + ':app':<26} {best}")
+
+if __name__ == "__main__":
+    main()
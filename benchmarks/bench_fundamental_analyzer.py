@@ -0,0 +1,120 @@
+"""
+Benchmark: analyze_fundamentals – הגרסה השורתית (apply) מול compute_analysis הווקטורית.
+בונה Fundamentals סינתטי (ברירת מחדל 100k שורות), מוודא פלט זהה אחרי fillna("") ודורש האצה של x10 לפחות.
+
+הרצה:  python benchmarks/bench_fundamental_analyzer.py [--rows 100000] [--min-speedup 10]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from fundamental_analyzer import compute_analysis, safe_float
+
+def legacy_analysis(df):
+    """המימוש השורתי הקודם מתוך analyze_fundamentals – לצורך השוואה בלבד"""
+    df = df.copy()
+    df["P/E"] = df["P/E"].apply(safe_float)
+    df["EPS Growth (%)"] = df["EPS Growth (%)"].apply(safe_float)
+
+    df["PEG (calc)"] = df.apply(
+        lambda x: round(x["P/E"] / x["EPS Growth (%)"], 2)
+        if x["P/E"] and x["EPS Growth (%)"] not in [None, 0] else None,
+        axis=1
+    )
+
+    def growth_rating(x):
+        if x is None:
+            return "N/A"
+        elif x > 15:
+            return "High"
+        elif x > 5:
+            return "Medium"
+        else:
+            return "Low"
+
+    df["Growth Rating"] = df["EPS Growth (%)"].apply(growth_rating)
+
+    def pe_rating(x):
+        if x is None:
+            return "N/A"
+        elif x > 30:
+            return "Overvalued"
+        elif x > 10:
+            return "Fair"
+        else:
+            return "Undervalued"
+
+    df["PE Rating"] = df["P/E"].apply(pe_rating)
+
+    def summary(x):
+        return f"{x['Symbol']} – {x['Growth Rating']} growth, {x['PE Rating']} valuation, PEG={x['PEG (calc)'] if x['PEG (calc)'] else 'N/A'}."
+
+    df["AI Summary"] = df.apply(summary, axis=1)
+    return df
+
+def synthetic_fundamentals(n, seed=42):
+    """שורות בסגנון get_all_records: מספרים, מחרוזות ריקות, 'N/A' ואפסים"""
+    rnd = random.Random(seed)
+
+    def value(lo, hi):
+        p = rnd.random()
+        if p < 0.08: return ""
+        if p < 0.10: return "N/A"
+        if p < 0.12: return 0
+        if p < 0.30: return rnd.randint(int(lo), int(hi))
+        return round(rnd.uniform(lo, hi), rnd.choice([1, 2, 3]))
+
+    rows = []
+    for i in range(n):
+        rows.append({
+            "Time": "2025-10-17 16:00:00",
+            "Symbol": f"S{i:05d}",
+            "Name": f"Company {i}",
+            "Price": round(rnd.uniform(1, 500), 2),
+            "P/E": value(-20, 80),
+            "EPS Growth (%)": value(-50, 60),
+            "PEG (Formula)": "",
+        })
+    return pd.DataFrame(rows)
+
+def best_of(fn, df, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-speedup", type=float, default=10.0)
+    args = parser.parse_args()
+
+    df = synthetic_fundamentals(args.rows)
+    old_t, old = best_of(legacy_analysis, df, 1)
+    new_t, new = best_of(compute_analysis, df, args.repeat)
+
+    old_rows = old.fillna("").values.tolist()
+    new_rows = new.fillna("").values.tolist()
+    identical = list(old.columns) == list(new.columns) and old_rows == new_rows
+    speedup = old_t / new_t
+
+    print(f"rows={args.rows}  legacy={old_t:.3f}s  vectorized={new_t:.4f}s  x{speedup:.1f}  identical={identical}")
+    if not identical:
+        diff = next(i for i, (a, b) in enumerate(zip(old_rows, new_rows)) if a != b)
+        print("❌ פלט שונה בשורה", diff, old_rows[diff], new_rows[diff])
+        sys.exit(1)
+    if speedup < args.min_speedup:
+        print(f"❌ האצה x{speedup:.1f} נמוכה מהסף x{args.min_speedup}")
+        sys.exit(1)
+    print("✅ פלט זהה והאצה מעל הסף")
+
+if __name__ == "__main__":
+    main()
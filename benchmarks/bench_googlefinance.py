@@ -0,0 +1,83 @@
+"""
+Benchmark: חילוץ P/E ו-EPS growth מדפי Google Finance שמורים.
+משווה את הגרסה הישנה (BeautifulSoup html.parser + get_text על כל הדף) לחילוץ הממוקד.
+
+הרצה:  python benchmarks/bench_googlefinance.py [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from fundamental_expander_autoPEG import GF_CHUNK_SIZE, extract_googlefinance_fields
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "googlefinance")
+
+def legacy_parse(html):
+    """המימוש הקודם של get_googlefinance_data (ללא הבקשה עצמה) – לצורך השוואה בלבד"""
+    soup = BeautifulSoup(html, "html.parser")
+    text = soup.get_text()
+
+    eps_growth = None
+    if "EPS growth" in text:
+        idx = text.find("EPS growth")
+        snippet = text[idx:idx+50]
+        num = ''.join(ch for ch in snippet if ch.isdigit() or ch == '.' or ch == '-')
+        if num:
+            try:
+                eps_growth = float(num)
+            except ValueError:
+                pass
+
+    pe_ratio = None
+    if "P/E ratio" in text:
+        idx = text.find("P/E ratio")
+        snippet = text[idx:idx+40]
+        num = ''.join(ch for ch in snippet if ch.isdigit() or ch == '.' or ch == '-')
+        if num:
+            try:
+                pe_ratio = float(num)
+            except ValueError:
+                pass
+
+    return {"pe": pe_ratio, "epsGrowth": eps_growth}
+
+def fast_parse(raw):
+    chunks = (raw[i:i + GF_CHUNK_SIZE] for i in range(0, len(raw), GF_CHUNK_SIZE))
+    values, _ = extract_googlefinance_fields(chunks)
+    return values
+
+def timeit(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    total_old = total_new = 0.0
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+            raw = f.read()
+        html = raw.decode("utf-8")
+
+        old_t = timeit(legacy_parse, html, args.repeat)
+        new_t = timeit(fast_parse, raw, args.repeat)
+        total_old += old_t
+        total_new += new_t
+        print(f"{name:<22} {len(raw)/1024:7.1f} KB  legacy={old_t*1000:8.2f} ms  "
+              f"fast={new_t*1000:7.3f} ms  x{old_t/new_t:6.1f}  "
+              f"legacy={legacy_parse(html)}  fast={fast_parse(raw)}")
+
+    print(f"\nסה\"כ: legacy={total_old*1000:.2f} ms, fast={total_new*1000:.3f} ms, האצה x{total_old/total_new:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark ל-index של ה-screener (GET /screen): בנייה, עדכון אינקרמנטלי של סבב quant חלקי,
+ו-latency של שאילתות top-K עם סינונים – על יקום סינתטי.
+
+הרצה:  python benchmarks/bench_screener.py [--sizes 1000 10000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from screener import ScreenIndex, PEG_FLAGS
+
+SECTORS = ["Technology", "Healthcare", "Financial Services", "Energy", "Consumer Cyclical",
+           "Industrials", "Utilities", "Real Estate", "Basic Materials", "Communication Services"]
+
+QUERIES = {
+    "top20": {},
+    "sector": {"sector": "Technology"},
+    "band 6-8": {"min_score": 6, "max_score": 8},
+    "peg good": {"peg_flags": {PEG_FLAGS["good"]}},
+    "sector+band+peg": {"sector": "Healthcare", "min_score": 5, "peg_flags": {PEG_FLAGS["good"], PEG_FLAGS["mid"]}},
+}
+
+def make_entry(rng, symbol):
+    value, growth, tech = rng.randint(0, 3), rng.randint(0, 3), rng.randint(0, 3)
+    return {
+        "symbol": symbol, "name": symbol, "sector": rng.choice(SECTORS), "industry": "",
+        "price": round(rng.uniform(1, 500), 2), "peg": None, "peg_flag": rng.choice(list(PEG_FLAGS.values())),
+        "pe_z": round(rng.gauss(0, 1), 2), "ps_z": round(rng.gauss(0, 1), 2), "pb_z": round(rng.gauss(0, 1), 2),
+        "score_value": value, "score_growth": growth, "score_tech": tech,
+        "total_score": float(value + growth + tech), "scored_at": "",
+    }
+
+def percentile(xs, p):
+    return xs[min(len(xs) - 1, int(len(xs) * p / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for size in args.sizes:
+        symbols = [f"SYM{i:05d}" for i in range(size)]
+        index = ScreenIndex()
+        t0 = time.perf_counter()
+        index.upsert(make_entry(rng, s) for s in symbols)
+        build = time.perf_counter() - t0
+
+        # סבב quant אינקרמנטלי: ~5% מהמניות חושבו מחדש
+        changed = rng.sample(symbols, max(1, size // 20))
+        t0 = time.perf_counter()
+        index.upsert(make_entry(rng, s) for s in changed)
+        update = time.perf_counter() - t0
+
+        print(f"\n📊 size={size}: build {build * 1000:.1f} ms, incremental upsert of {len(changed)} "
+              f"{update * 1000:.2f} ms")
+        print(f"{'query':<18} {'p50 us':>8} {'p99 us':>8} {'rows':>5}")
+        for name, filters in QUERIES.items():
+            samples = []
+            for _ in range(args.queries):
+                t0 = time.perf_counter()
+                rows = index.query(k=args.k, **filters)
+                samples.append(time.perf_counter() - t0)
+            samples.sort()
+            print(f"{name:<18} {percentile(samples, 50) * 1e6:8.1f} {percentile(samples, 99) * 1e6:8.1f} {len(rows):>5}")
+
+if __name__ == "__main__":
+    main()
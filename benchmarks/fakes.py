@@ -0,0 +1,119 @@
+"""
+תחליף מקומי ל-Google Sheets: Worksheet/Spreadsheet בזיכרון עם אותו API של gspread שהקוד משתמש בו,
+וספירת קריאות לכל מתודה (כל קריאה כזו היא API call אמיתי בפרודקשן).
+"""
+from collections import Counter
+
+# מונה גלובלי לכל ה"קריאות החיצוניות" בריצה: sheets.append_rows, yahoo.info, fmp.profile וכו'
+CALLS = Counter()
+
+def count(name, n=1):
+    CALLS[name] += n
+
+def _cell(v):
+    # Sheets מחזיר הכל כמחרוזות ב-get_all_values
+    return "" if v is None else str(v)
+
+def _numericise(v):
+    """כמו gspread.utils.numericise – מחרוזת מספרית → int/float"""
+    if v == "":
+        return v
+    try:
+        return int(v)
+    except ValueError:
+        try:
+            return float(v)
+        except ValueError:
+            return v
+
+def _col_to_index(col):
+    n = 0
+    for ch in col:
+        n = n * 26 + (ord(ch) - 64)
+    return n - 1
+
+class FakeWorksheet:
+    def __init__(self, title, spreadsheet=None, rows=None):
+        self.title = title
+        self.spreadsheet = spreadsheet
+        self.rows = [list(r) for r in (rows or [])]
+
+    # ----- קריאה -----
+    def get_all_values(self):
+        count("sheets.get_all_values")
+        return [[_cell(v) for v in r] for r in self.rows]
+
+    def get_all_records(self):
+        count("sheets.get_all_records")
+        if not self.rows:
+            return []
+        header = [_cell(h) for h in self.rows[0]]
+        return [
+            dict(zip(header, (_numericise(_cell(v)) for v in r + [""] * (len(header) - len(r)))))
+            for r in self.rows[1:]
+        ]
+
+    # ----- כתיבה -----
+    def clear(self):
+        count("sheets.clear")
+        self.rows = []
+
+    def append_row(self, values, **kwargs):
+        count("sheets.append_row")
+        self.rows.append(list(values))
+
+    def append_rows(self, values, **kwargs):
+        count("sheets.append_rows")
+        self.rows.extend(list(r) for r in values)
+
+    def update_acell(self, label, value):
+        count("sheets.update_acell")
+        col = "".join(ch for ch in label if ch.isalpha())
+        row = int(label[len(col):])
+        self._set(row - 1, _col_to_index(col), value)
+
+    def batch_update(self, data, **kwargs):
+        count("sheets.batch_update")
+        for item in data:
+            start = item["range"].split(":")[0]
+            col = "".join(ch for ch in start if ch.isalpha())
+            row = int(start[len(col):]) - 1
+            for i, values in enumerate(item["values"]):
+                for j, v in enumerate(values):
+                    self._set(row + i, _col_to_index(col) + j, v)
+
+    def delete_rows(self, start_index, end_index=None):
+        count("sheets.delete_rows")
+        end_index = start_index if end_index is None else end_index
+        del self.rows[start_index - 1:end_index]
+
+    def _set(self, r, c, value):
+        while len(self.rows) <= r:
+            self.rows.append([])
+        row = self.rows[r]
+        while len(row) <= c:
+            row.append("")
+        row[c] = value
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.sheets = {}
+
+    def worksheet(self, name):
+        count("sheets.worksheet")
+        if name not in self.sheets:
+            import gspread
+            raise gspread.exceptions.WorksheetNotFound(name)
+        return self.sheets[name]
+
+    def add_worksheet(self, title, rows=1000, cols=20):
+        count("sheets.add_worksheet")
+        self.sheets[title] = FakeWorksheet(title, self)
+        return self.sheets[title]
+
+    def get(self, name):
+        """כמו get_sheet/get_ws של המודולים: פותח או יוצר גיליון (נספר כ-open)"""
+        count("sheets.open")
+        if name not in self.sheets:
+            self.sheets[name] = FakeWorksheet(name, self)
+        return self.sheets[name]
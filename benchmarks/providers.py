@@ -0,0 +1,159 @@
+"""
+ספקי נתונים מוקלטים: Yahoo (yf.Ticker), FMP, TradingView (TA_Handler + scanner) ו-Google Finance.
+כל סימבול ביקום הסינתטי ממופה לאחד הסימבולים המוקלטים (AAPL, TSLA, ...), כך שיקום של 10,000 מניות
+מריץ בדיוק את אותם מסלולי קוד כמו בפרודקשן – בלי רשת.
+"""
+import contextlib
+import json
+import os
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+
+from fakes import FakeSpreadsheet, count
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def _load(name):
+    with open(os.path.join(FIXTURES_DIR, "providers", name), encoding="utf-8") as f:
+        return json.load(f)
+
+YAHOO_INFO = _load("yahoo_info.json")
+YAHOO_EARNINGS = _load("yahoo_earnings_dates.json")
+FMP_PROFILE = _load("fmp_profile.json")
+TV_TA = _load("tradingview_ta.json")
+TV_SCAN = _load("tradingview_scan.json")
+OPENAI_ANALYZE = _load("openai_analyze_response.json")
+RECORDED = sorted(YAHOO_INFO)
+
+def _load_gf_pages():
+    pages = {}
+    gf_dir = os.path.join(FIXTURES_DIR, "googlefinance")
+    for name in os.listdir(gf_dir):
+        with open(os.path.join(gf_dir, name), "rb") as f:
+            pages[name.split("_")[0]] = f.read()
+    return pages
+
+GF_PAGES = _load_gf_pages()
+
+# ===== יקום סינתטי =====
+def make_universe(n):
+    """n סימבולים: הראשונים הם המוקלטים עצמם, השאר AAPL.0005 וכו' (ממופים חזרה לתבנית)"""
+    return [RECORDED[i] if i < len(RECORDED) else f"{RECORDED[i % len(RECORDED)]}.{i}" for i in range(n)]
+
+def template_of(symbol):
+    return symbol.split(".")[0]
+
+# ===== ספקים מזויפים =====
+class Latency:
+    """עיכוב רשת מדומה לכל קריאה לספק (ms); 0 = ללא עיכוב"""
+    ms = 0.0
+
+    @classmethod
+    def wait(cls):
+        if cls.ms:
+            time.sleep(cls.ms / 1000.0)
+
+class FakeTicker:
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self._tmpl = template_of(symbol)
+
+    @property
+    def info(self):
+        count("yahoo.info")
+        Latency.wait()
+        return dict(YAHOO_INFO.get(self._tmpl, {}))
+
+    def get_earnings_dates(self, limit=12):
+        count("yahoo.earnings_dates")
+        Latency.wait()
+        df = pd.DataFrame(YAHOO_EARNINGS.get(self._tmpl, [])[:limit])
+        if not df.empty:
+            df = df.set_index("Earnings Date")
+        return df
+
+class FakeTAHandler:
+    def __init__(self, symbol, screener, exchange, interval):
+        self.symbol = symbol
+
+    def get_analysis(self):
+        count("tradingview.ta")
+        Latency.wait()
+        rec = TV_TA.get(template_of(self.symbol))
+        if rec is None:
+            raise Exception("Exchange or symbol not found.")
+        return SimpleNamespace(indicators=dict(rec["indicators"]), summary=dict(rec["summary"]))
+
+class FakeResponse:
+    def __init__(self, payload=None, body=None, status_code=200):
+        self._payload = payload
+        self._body = body or b""
+        self.status_code = status_code
+        self.text = self._body.decode("utf-8", "ignore") if body is not None else json.dumps(payload)
+
+    def json(self):
+        return self._payload
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self._body), chunk_size):
+            yield self._body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def fake_get(url, *args, **kwargs):
+    Latency.wait()
+    if "financialmodelingprep.com" in url:
+        count("fmp.profile")
+        symbol = url.split("/profile/")[1].split("?")[0]
+        return FakeResponse(FMP_PROFILE.get(template_of(symbol), []))
+    if "google.com/finance" in url:
+        count("googlefinance.quote")
+        symbol = url.split("/quote/")[1].split(":")[0]
+        return FakeResponse(body=GF_PAGES.get(template_of(symbol), b"<html></html>"))
+    raise RuntimeError(f"unexpected GET in benchmark: {url}")
+
+def fake_post(url, *args, json=None, **kwargs):
+    Latency.wait()
+    if "scanner.tradingview.com" in url:
+        count("tradingview.scan")
+        ticker = (json or {}).get("symbols", {}).get("tickers", [":"])[0]
+        return FakeResponse(TV_SCAN.get(template_of(ticker.split(":")[1]), {"totalCount": 0, "data": []}))
+    raise RuntimeError(f"unexpected POST in benchmark: {url}")
+
+# ===== התקנת הזיופים על המודולים =====
+@contextlib.contextmanager
+def patched_providers(spreadsheet=None, latency_ms=0.0):
+    """מחליף רשת + Sheets בכל המודולים של הפרויקט; מחזיר את ה-FakeSpreadsheet"""
+    import fundamental_analyzer
+    import fundamental_expander_autoPEG
+    import quant_engine
+    import sheet_poller
+
+    ss = spreadsheet or FakeSpreadsheet()
+    Latency.ms = latency_ms
+
+    def fundamentals_sheet(name):
+        ws = ss.get(name)
+        ws.spreadsheet = ss
+        return ws
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch("yfinance.Ticker", FakeTicker))
+        stack.enter_context(mock.patch("requests.get", fake_get))
+        stack.enter_context(mock.patch("requests.post", fake_post))
+        stack.enter_context(mock.patch.object(sheet_poller, "TA_Handler", FakeTAHandler))
+        stack.enter_context(mock.patch.object(sheet_poller, "get_sheet", lambda name="StockData": ss.get(name)))
+        stack.enter_context(mock.patch.object(quant_engine, "get_ws", ss.get))
+        stack.enter_context(mock.patch.object(fundamental_expander_autoPEG, "get_sheet", ss.get))
+        stack.enter_context(mock.patch.object(fundamental_analyzer, "get_sheet", fundamentals_sheet))
+        yield ss
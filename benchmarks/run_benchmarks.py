@@ -0,0 +1,237 @@
+"""
+Benchmark offline לכל נקודות הכניסה: poller (update_stockdata), quant (run_quant), enrich (enrich_to_sheets),
+analyze_fundamentals, POST /analyze ו-POST /analyze/batch – על fixtures מוקלטים, Sheets בזיכרון ושרת OpenAI מדומה.
+
+לכל שלב ולכל גודל יקום מדווח: throughput, אחוזוני latency לפריט, זיכרון שיא וספירת API calls.
+
+הרצה:
+    python benchmarks/run_benchmarks.py --sizes 10 100 1000 10000
+    python benchmarks/run_benchmarks.py --sizes 100 --stages poller quant --latency-ms 20 --json out.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest import mock
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import CALLS, FakeSpreadsheet
+from providers import make_universe, patched_providers
+from stub_openai import StubState, start_stub_server
+
+STAGES = ["poller", "quant", "enrich", "analyze_fundamentals", "analyze", "analyze_batch"]
+# איזה שלבים קוראים את הגיליון שכל שלב כותב (StockData → quant/enrich, Fundamentals → analyze_fundamentals)
+SHEET_STAGES_AFTER = {
+    "poller": ["quant", "enrich", "analyze_fundamentals"],
+    "quant": [],
+    "enrich": ["analyze_fundamentals"],
+    "analyze_fundamentals": [],
+}
+
+# ===== כלי מדידה =====
+@contextlib.contextmanager
+def timed(module, func_name, samples):
+    """עוטף פונקציה במודול ורושם את משך כל קריאה (שניות) ל-samples"""
+    original = getattr(module, func_name)
+
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - t0)
+
+    with mock.patch.object(module, func_name, wrapper):
+        yield
+
+def percentile(sorted_xs, p):
+    if not sorted_xs:
+        return None
+    k = max(0, min(len(sorted_xs) - 1, int(round(p / 100.0 * len(sorted_xs) + 0.5)) - 1))
+    return sorted_xs[k]
+
+# ===== שלבים =====
+# כל שלב מקבל (ss, symbols, ctx) ומחזיר (items, per-item latencies)
+def stage_poller(ss, symbols, ctx):
+    import sheet_poller
+    sheet_poller._cache.clear()
+    samples = []
+    with timed(sheet_poller, "get_full_stock_data", samples):
+        sheet_poller.update_stockdata(
+            symbols,
+            snapshot_path=os.path.join(ctx["tmp"], "snapshot.db"),
+            archive_path=os.path.join(ctx["tmp"], "archive.db"),
+        )
+    return len(symbols), samples
+
+def stage_quant(ss, symbols, ctx):
+    import quant_engine
+    samples = []
+    with timed(quant_engine, "score_row", samples):
+        quant_engine.run_quant(
+            archive_path=os.path.join(ctx["tmp"], "archive.db"),
+            state_path=os.path.join(ctx["tmp"], "quant_state.json"),
+        )
+    return len(samples), samples
+
+def stage_enrich(ss, symbols, ctx):
+    import fundamental_expander_autoPEG
+    samples = []
+    with timed(fundamental_expander_autoPEG, "get_full_fundamentals", samples):
+        fundamental_expander_autoPEG.enrich_to_sheets()
+    return len(samples), samples
+
+def stage_analyze_fundamentals(ss, symbols, ctx):
+    import fundamental_analyzer
+    fundamental_analyzer.analyze_fundamentals()
+    # שלב וקטורי אחד – אין latency לפריט
+    return max(0, len(ss.get("Analysis").rows) - 1), []
+
+def stage_analyze(ss, symbols, ctx):
+    client = ctx["http"]
+    samples = []
+    tickers = symbols[:ctx["analyze_cap"]]
+    for t in tickers:
+        t0 = time.perf_counter()
+        r = client.post("/analyze", json={"ticker": t, "timeframe": "6mo", "dsl": "SMA(10) cross SMA(50) and RSI<70"})
+        samples.append(time.perf_counter() - t0)
+        CALLS[f"http.analyze.{r.status_code}"] += 1
+    return len(tickers), samples
+
+def stage_analyze_batch(ss, symbols, ctx):
+    client = ctx["http"]
+    tickers = symbols[:ctx["analyze_cap"]]
+    t0 = time.perf_counter()
+    r = client.post("/analyze/batch", json={
+        "requests": [{"ticker": t, "timeframe": "6mo", "dsl": "SMA(10) cross SMA(50) and RSI<70"} for t in tickers],
+        "pack_size": ctx["pack_size"],
+    })
+    CALLS[f"http.analyze_batch.{r.status_code}"] += 1
+    if r.status_code == 200:
+        body = r.json()
+        CALLS["analyze_batch.packed"] += sum(1 for it in body["results"] if it["packed"])
+        CALLS["analyze_batch.errors"] += sum(1 for it in body["results"] if it["error"])
+    # latency לבקשה אחת – אין משמעות ל-p50 לפריט
+    return len(tickers), [time.perf_counter() - t0]
+
+STAGE_FUNCS = {
+    "poller": stage_poller,
+    "quant": stage_quant,
+    "enrich": stage_enrich,
+    "analyze_fundamentals": stage_analyze_fundamentals,
+    "analyze": stage_analyze,
+    "analyze_batch": stage_analyze_batch,
+}
+
+def run_once(fn, ss, symbols, ctx, memory):
+    CALLS.clear()
+    StubState.requests = StubState.input_tokens = StubState.output_tokens = 0
+    if memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        items, samples = fn(ss, symbols, ctx)
+    wall = time.perf_counter() - t0
+    peak = None
+    if memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    calls = dict(CALLS)
+    if StubState.requests:
+        calls["openai.responses"] = StubState.requests
+        calls["openai.input_tokens"] = StubState.input_tokens
+        calls["openai.output_tokens"] = StubState.output_tokens
+    return items, samples, wall, peak, calls
+
+def run_stage(name, ss, symbols, ctx, memory):
+    fn = STAGE_FUNCS[name]
+    items, samples, wall, _, calls = run_once(fn, ss, symbols, ctx, memory=False)
+    peak = None
+    if memory:
+        # מעבר נפרד עם tracemalloc כדי שהתקורה שלו לא תעוות את זמני הריצה
+        _, _, _, peak, _ = run_once(fn, ss, symbols, ctx, memory=True)
+    xs = sorted(samples)
+    return {
+        "stage": name,
+        "size": len(symbols),
+        "items": items,
+        "wall_s": wall,
+        "throughput": items / wall if wall else None,
+        "p50_ms": None if not xs else percentile(xs, 50) * 1000,
+        "p95_ms": None if not xs else percentile(xs, 95) * 1000,
+        "p99_ms": None if not xs else percentile(xs, 99) * 1000,
+        "peak_mb": None if peak is None else peak / 1e6,
+        "calls": calls,
+    }
+
+# ===== דוח =====
+def fmt(v, spec):
+    return "-" if v is None else format(v, spec)
+
+def print_header():
+    print(f"{'size':>6} {'stage':<21} {'items':>6} {'wall s':>8} {'items/s':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak MB':>8}  calls")
+
+def print_row(r):
+    calls = ", ".join(f"{k}={v}" for k, v in sorted(r["calls"].items()))
+    print(f"{r['size']:>6} {r['stage']:<21} {r['items']:>6} {r['wall_s']:>8.3f} "
+          f"{fmt(r['throughput'], '9.1f'):>9} {fmt(r['p50_ms'], '8.3f'):>8} {fmt(r['p95_ms'], '8.3f'):>8} "
+          f"{fmt(r['p99_ms'], '8.3f'):>8} {fmt(r['peak_mb'], '8.2f'):>8}  {calls}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="simulated network latency per provider / OpenAI call")
+    parser.add_argument("--analyze-cap", type=int, default=200,
+                        help="max /analyze requests per universe size")
+    parser.add_argument("--pack-size", type=int, default=5, help="tickers per model call for analyze_batch")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--json", help="write results to this file as JSON")
+    args = parser.parse_args()
+
+    ctx = {"analyze_cap": args.analyze_cap, "pack_size": args.pack_size}
+    stub = None
+    if "analyze" in args.stages or "analyze_batch" in args.stages:
+        stub, base_url = start_stub_server(latency_ms=args.latency_ms)
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+        from fastapi.testclient import TestClient
+        import ai_analyzer_server
+        ctx["http"] = TestClient(ai_analyzer_server.app)
+
+    results = []
+    print_header()
+    try:
+        for size in args.sizes:
+            symbols = make_universe(size)
+            with tempfile.TemporaryDirectory() as tmp, \
+                    patched_providers(FakeSpreadsheet(), args.latency_ms) as ss:
+                ctx["tmp"] = tmp
+                for name in STAGES:
+                    if name in args.stages:
+                        results.append(run_stage(name, ss, symbols, ctx, memory=not args.no_memory))
+                        print_row(results[-1])
+                    elif name in SHEET_STAGES_AFTER and any(s in args.stages for s in SHEET_STAGES_AFTER[name]):
+                        # שלב שלא נבחר אבל שלב מאוחר יותר קורא את הגיליון שלו – רץ כ-seed בלי מדידה
+                        run_once(STAGE_FUNCS[name], ss, symbols, ctx, memory=False)
+    finally:
+        if stub:
+            stub.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 נשמר {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+שרת OpenAI מדומה (POST /v1/responses) ל-benchmark של /analyze ו-/analyze/batch.
+מחזיר תשובה מוקלטת בפורמט Responses API, עם usage, ומונה בקשות ו-tokens.
+כמו ה-API האמיתי, דוחה ב-400 סכמת strict שלא עומדת בכללי structured outputs.
+
+הרצה עצמאית:  python benchmarks/stub_openai.py --port 8765
+ואז:  OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub uvicorn ai_analyzer_server:app
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from providers import OPENAI_ANALYZE
+
+class StubState:
+    latency_ms = 0.0
+    requests = 0
+    input_tokens = 0
+    output_tokens = 0
+    lock = threading.Lock()
+
+def _ticker_from_input(body):
+    for msg in body.get("input", []):
+        content = msg.get("content") if isinstance(msg, dict) else None
+        if isinstance(content, str) and content.startswith("Ticker:"):
+            return content.split("\n", 1)[0].split(":", 1)[1].strip()
+    return None
+
+def _tickers_from_batch_input(body):
+    """כל שורות 'Ticker:' בפרומפט של /analyze/batch"""
+    out = []
+    for msg in body.get("input", []):
+        content = msg.get("content") if isinstance(msg, dict) else None
+        if isinstance(content, str) and msg.get("role") == "user":
+            out += [line.split(":", 1)[1].strip() for line in content.splitlines() if line.startswith("Ticker:")]
+    return out
+
+def _is_batch(body):
+    return ((body.get("text") or {}).get("format") or {}).get("name") == "analyze_batch_response"
+
+def build_response(body):
+    if _is_batch(body):
+        result = {"results": [{"ticker": t, "analysis": dict(OPENAI_ANALYZE, name=t)}
+                              for t in _tickers_from_batch_input(body)]}
+    else:
+        result = dict(OPENAI_ANALYZE)
+        ticker = _ticker_from_input(body)
+        if ticker:
+            result["name"] = ticker
+    text = json.dumps(result)
+    # הערכה גסה: ~4 תווים ל-token
+    in_tokens = len(json.dumps(body)) // 4
+    out_tokens = len(text) // 4
+    return {
+        "id": f"resp_stub_{time.time_ns()}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": body.get("model", "stub"),
+        "output": [{
+            "id": "msg_stub",
+            "type": "message",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": in_tokens,
+            "output_tokens": out_tokens,
+            "total_tokens": in_tokens + out_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens_details": {"reasoning_tokens": 0},
+        },
+    }
+
+def strict_schema_errors(schema, path="#"):
+    """
+    אותן בדיקות ש-OpenAI עושה ל-json_schema עם strict=True (ודוחה ב-400):
+    לכל object – additionalProperties=false וכל ה-properties ב-required, ובלי default.
+    """
+    errors = []
+    if not isinstance(schema, dict):
+        return errors
+    if "default" in schema:
+        errors.append(f"{path}: 'default' is not permitted")
+    props = schema.get("properties")
+    if schema.get("type") == "object" and isinstance(props, dict):
+        if schema.get("additionalProperties") is not False:
+            errors.append(f"{path}: 'additionalProperties' is required to be supplied and to be false")
+        missing = [k for k in props if k not in schema.get("required", [])]
+        if missing:
+            errors.append(f"{path}: 'required' is required to include every key in properties; missing {missing}")
+    for key in ("properties", "$defs"):
+        for name, sub in (schema.get(key) or {}).items():
+            errors += strict_schema_errors(sub, f"{path}/{key}/{name}")
+    for key in ("anyOf", "allOf", "oneOf"):
+        for i, sub in enumerate(schema.get(key) or []):
+            errors += strict_schema_errors(sub, f"{path}/{key}/{i}")
+    errors += strict_schema_errors(schema.get("items"), f"{path}/items")
+    return errors
+
+def schema_error(body):
+    fmt = (body.get("text") or {}).get("format") or {}
+    if fmt.get("type") != "json_schema" or not fmt.get("strict"):
+        return None
+    errors = strict_schema_errors(fmt.get("schema"))
+    return f"Invalid schema for response_format '{fmt.get('name')}': {errors[0]}" if errors else None
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/responses"):
+            self._send(404, {"error": {"message": f"stub: unknown path {self.path}"}})
+            return
+        error = schema_error(body)
+        if error:
+            self._send(400, {"error": {"message": error, "type": "invalid_request_error", "param": "text.format.schema"}})
+            return
+        if StubState.latency_ms:
+            time.sleep(StubState.latency_ms / 1000.0)
+        resp = build_response(body)
+        with StubState.lock:
+            StubState.requests += 1
+            StubState.input_tokens += resp["usage"]["input_tokens"]
+            StubState.output_tokens += resp["usage"]["output_tokens"]
+        self._send(200, resp)
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def start_stub_server(port=0, latency_ms=0.0):
+    """מפעיל את השרת ב-thread ברקע; מחזיר (server, base_url)"""
+    StubState.latency_ms = latency_ms
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub OpenAI Responses API server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    server, url = start_stub_server(args.port, args.latency_ms)
+    print(f"🤖 stub OpenAI פועל ב-{url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,15 +1,21 @@
+import argparse
 import gspread
 from google.oauth2.service_account import Credentials
+import numpy as np
 import pandas as pd
+import metrics
+from metrics import span, timed
+from profiler import add_profile_args, run_with_profile
 
 SHEET_ID = "1YTrPFfnpjaJN6r779kYrGxfVSa2zNXCH_RrfLYmSHMM"
 CREDENTIALS_FILE = "credentials.json"
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
 def get_sheet(name):
-    creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-    client = gspread.authorize(creds)
-    return client.open_by_key(SHEET_ID).worksheet(name)
+    with span("sheets", "open"):
+        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
+        client = gspread.authorize(creds)
+        return client.open_by_key(SHEET_ID).worksheet(name)
 
 def safe_float(x):
     try:
@@ -17,6 +23,49 @@ def safe_float(x):
     except (ValueError, TypeError):
         return None
 
+def _rating(values, high, mid, labels):
+    """דירוג לפי שני ספים: > high, > mid, אחרת – בדיוק כמו הגרסה השורתית (NaN נופל לברירת המחדל)"""
+    if not values.notna().any():
+        # עמודה ריקה כולה נשארה None בגרסה השורתית → N/A
+        return np.full(len(values), "N/A", dtype=object)
+    v = values.to_numpy()
+    codes = np.select([v > high, v > mid], [0, 1], default=2)
+    return np.array(labels, dtype=object)[codes]
+
+def compute_analysis(df):
+    """מוסיף ל-df את עמודות הניתוח (PEG, דירוגים וסיכום) בצורה וקטורית"""
+    df = df.copy()
+    pe = pd.to_numeric(df["P/E"], errors="coerce").astype("float64")
+    eps = pd.to_numeric(df["EPS Growth (%)"], errors="coerce").astype("float64")
+    df["P/E"] = pe
+    df["EPS Growth (%)"] = eps
+
+    # PEG = P/E ÷ צמיחה; אפס באחד מהם → ריק. round של פייתון (ולא np.round) כדי לשמור על אותן ספרות בדיוק
+    ratio = (pe / eps).where((pe != 0) & (eps != 0))
+    if ratio.notna().any():
+        peg = pd.Series([round(v, 2) for v in ratio.tolist()], index=df.index, dtype="float64")
+    else:
+        peg = pd.Series(np.nan, index=df.index)
+    df["PEG (calc)"] = peg
+
+    growth = _rating(eps, 15, 5, ["High", "Medium", "Low"])
+    pe_rate = _rating(pe, 30, 10, ["Overvalued", "Fair", "Undervalued"])
+    df["Growth Rating"] = growth
+    df["PE Rating"] = pe_rate
+
+    # הרכבת הסיכום על מערכי object של numpy – שרשור מחרוזות ב-C בלי apply לכל שורה
+    if peg.notna().any():
+        peg_text = np.array(list(map(str, peg.tolist())), dtype=object)
+        peg_text[peg.to_numpy() == 0] = "N/A"
+    else:
+        peg_text = "N/A"
+    df["AI Summary"] = (
+        df["Symbol"].astype(str).to_numpy(dtype=object) + " – " + growth + " growth, "
+        + pe_rate + " valuation, PEG=" + peg_text + "."
+    )
+    return df
+
+@timed("stage", "analyze_fundamentals")
 def analyze_fundamentals():
     fundamentals = get_sheet("Fundamentals")
     ss = fundamentals.spreadsheet
@@ -26,58 +75,32 @@ def analyze_fundamentals():
     except gspread.exceptions.WorksheetNotFound:
         analysis = ss.add_worksheet(title="Analysis", rows=200, cols=20)
 
-    data = fundamentals.get_all_records()
+    with span("sheets", "get_all_records"):
+        data = fundamentals.get_all_records()
     df = pd.DataFrame(data)
 
     if df.empty:
         print("⚠️ אין נתונים לניתוח.")
         return
 
-    df["P/E"] = df["P/E"].apply(safe_float)
-    df["EPS Growth (%)"] = df["EPS Growth (%)"].apply(safe_float)
-
-    df["PEG (calc)"] = df.apply(
-        lambda x: round(x["P/E"] / x["EPS Growth (%)"], 2)
-        if x["P/E"] and x["EPS Growth (%)"] not in [None, 0] else None,
-        axis=1
-    )
-
-    def growth_rating(x):
-        if x is None:
-            return "N/A"
-        elif x > 15:
-            return "High"
-        elif x > 5:
-            return "Medium"
-        else:
-            return "Low"
-
-    df["Growth Rating"] = df["EPS Growth (%)"].apply(growth_rating)
-
-    def pe_rating(x):
-        if x is None:
-            return "N/A"
-        elif x > 30:
-            return "Overvalued"
-        elif x > 10:
-            return "Fair"
-        else:
-            return "Undervalued"
-
-    df["PE Rating"] = df["P/E"].apply(pe_rating)
-
-    def summary(x):
-        return f"{x['Symbol']} – {x['Growth Rating']} growth, {x['PE Rating']} valuation, PEG={x['PEG (calc)'] if x['PEG (calc)'] else 'N/A'}."
-
-    df["AI Summary"] = df.apply(summary, axis=1)
+    with span("cpu", "compute_analysis"):
+        df = compute_analysis(df)
 
     # 👇 זה הפתרון – מחליף כל NaN במחרוזת ריקה
     df = df.fillna("")
 
-    analysis.clear()
-    analysis.append_row(list(df.columns))
-    analysis.append_rows(df.values.tolist())
+    with span("sheets", "clear"):
+        analysis.clear()
+    with span("sheets", "append_row"):
+        analysis.append_row(list(df.columns))
+    with span("sheets", "append_rows"):
+        analysis.append_rows(df.values.tolist())
     print("✅ ניתוח פונדמנטלי בסיסי הושלם ונשמר בגיליון 'Analysis'.")
 
 if __name__ == "__main__":
-    analyze_fundamentals()
+    parser = argparse.ArgumentParser(description="Rate the Fundamentals sheet into the Analysis sheet")
+    parser.add_argument("--metrics-file", help="dump timing metrics at the end (.prom or .json)")
+    add_profile_args(parser)
+    args = parser.parse_args()
+    run_with_profile(args, analyze_fundamentals)
+    metrics.dump(args.metrics_file)
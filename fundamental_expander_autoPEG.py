@@ -1,9 +1,17 @@
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 import yfinance as yf
 import gspread
 import requests
 from bs4 import BeautifulSoup
 from google.oauth2.service_account import Credentials
 from datetime import datetime
+import metrics
+from metrics import span, timed
+from profiler import add_profile_args, run_with_profile
+from watchlist import symbol_meta
 
 SHEET_ID = "1YTrPFfnpjaJN6r779kYrGxfVSa2zNXCH_RrfLYmSHMM"
 CREDENTIALS_FILE = "credentials.json"
@@ -11,24 +19,26 @@ SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
 # ---------------- Google Sheets ----------------
 def get_sheet(name):
-    creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-    client = gspread.authorize(creds)
-    ss = client.open_by_key(SHEET_ID)
-    try:
-        return ss.worksheet(name)
-    except gspread.exceptions.WorksheetNotFound:
-        return ss.add_worksheet(title=name, rows=2000, cols=50)
+    with span("sheets", "open"):
+        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
+        client = gspread.authorize(creds)
+        ss = client.open_by_key(SHEET_ID)
+        try:
+            return ss.worksheet(name)
+        except gspread.exceptions.WorksheetNotFound:
+            return ss.add_worksheet(title=name, rows=2000, cols=50)
 
 # ---------------- TradingView ----------------
 def get_tradingview_data(symbol):
     try:
         url = "https://scanner.tradingview.com/america/scan"
         payload = {
-            "symbols": {"tickers": [f"NASDAQ:{symbol}"], "query": {"types": []}},
+            "symbols": {"tickers": [f"{symbol_meta.get_exchange(symbol) or 'NASDAQ'}:{symbol}"], "query": {"types": []}},
             "columns": ["price_earnings_ttm", "earnings_per_share_next_fy", "earnings_per_share_yoy_g"]
         }
-        r = requests.post(url, json=payload)
-        j = r.json()
+        with span("provider", "tradingview_scan"):
+            r = requests.post(url, json=payload)
+            j = r.json()
         if j.get("data"):
             d = j["data"][0]["d"]
             return {
@@ -40,38 +50,111 @@ def get_tradingview_data(symbol):
     return {}
 
 # ---------------- Google Finance Scraping ----------------
+# חילוץ ממוקד: regex מקומפל מראש על ה-bytes הגולמיים, בלי לבנות עץ DOM מלא ובלי get_text על כל הדף.
+# הערך הוא צומת הטקסט הקצר הראשון אחרי התווית (ה-tooltip הארוך שבאמצע מדולג).
+GF_LABELS = {
+    "pe": re.compile(rb">\s*P/E ratio\s*<"),
+    "epsGrowth": re.compile(rb">\s*EPS growth\s*<"),
+}
+GF_VALUE_RE = re.compile(rb">\s*([^<>\s][^<>]{0,23}?)\s*<")
+GF_VALUE_WINDOW = 2048
+# קודי בורסה של TradingView שנכתבים אחרת ב-Google Finance
+GF_EXCHANGES = {"AMEX": "NYSEAMERICAN"}
+GF_CHUNK_SIZE = 32 * 1024
+
+try:
+    import lxml  # noqa: F401
+    GF_FALLBACK_PARSER = "lxml"
+except ImportError:
+    GF_FALLBACK_PARSER = "html.parser"
+
+def parse_gf_number(raw):
+    """'1,234.5' / '−3.2%' → float; '-' או טקסט → None"""
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8", "ignore")
+    raw = raw.strip().replace(",", "").replace("\u2212", "-").rstrip("%").strip()
+    try:
+        return float(raw)
+    except ValueError:
+        return None
+
+def extract_googlefinance_fields(chunks):
+    """
+    סורק זרם של chunks (bytes) ועוצר ברגע שכל השדות נמצאו.
+    מחזיר (values, labels_seen) – labels_seen=False אם אף תווית לא הופיעה בדף.
+    """
+    buf = b""
+    values = {}
+    scan_from = {k: 0 for k in GF_LABELS}
+    labels_seen = False
+    for chunk in chunks:
+        buf += chunk
+        for key, label_re in GF_LABELS.items():
+            if key in values:
+                continue
+            m = label_re.search(buf, scan_from[key])
+            if not m:
+                # התווית עוד לא הגיעה – ממשיכים מקצה ה-buffer (עם חפיפה לתווית שנחתכה)
+                scan_from[key] = max(0, len(buf) - 64)
+                continue
+            labels_seen = True
+            if len(buf) < m.end() + GF_VALUE_WINDOW:
+                scan_from[key] = m.start()  # הערך אולי עוד לא הגיע – נחכה ל-chunk הבא
+                continue
+            v = GF_VALUE_RE.search(buf, m.end() - 1, m.end() + GF_VALUE_WINDOW)
+            values[key] = parse_gf_number(v.group(1)) if v else None
+        if len(values) == len(GF_LABELS):
+            return values, labels_seen
+
+    # סוף הדף: משלימים שדות שהתווית שלהם קרובה לסוף
+    for key, label_re in GF_LABELS.items():
+        if key in values:
+            continue
+        m = label_re.search(buf, scan_from[key])
+        if m:
+            labels_seen = True
+            v = GF_VALUE_RE.search(buf, m.end() - 1, m.end() + GF_VALUE_WINDOW)
+            values[key] = parse_gf_number(v.group(1)) if v else None
+        else:
+            values[key] = None
+    if not labels_seen:
+        values = _extract_googlefinance_tree(buf)
+    return values, labels_seen
+
+def _extract_googlefinance_tree(html):
+    """גיבוי כשהמבנה השתנה: עץ DOM (lxml אם מותקן) וחיפוש ממוקד של התוויות בלבד"""
+    soup = BeautifulSoup(html, GF_FALLBACK_PARSER)
+    values = {}
+    for key, text in (("pe", "P/E ratio"), ("epsGrowth", "EPS growth")):
+        values[key] = None
+        node = soup.find(string=lambda s: s and s.strip() == text)
+        if node is None:
+            continue
+        for nxt in node.find_all_next(string=True, limit=20):
+            t = nxt.strip()
+            if t and len(t) <= 24:
+                values[key] = parse_gf_number(t)
+                break
+    return values
+
 def get_googlefinance_data(symbol):
     try:
-        url = f"https://www.google.com/finance/quote/{symbol}:NASDAQ"
-        r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
-        soup = BeautifulSoup(r.text, "html.parser")
-        text = soup.get_text()
-
-        # חיפוש PEG או EPS growth
-        eps_growth = None
-        if "EPS growth" in text:
-            idx = text.find("EPS growth")
-            snippet = text[idx:idx+50]
-            num = ''.join(ch for ch in snippet if ch.isdigit() or ch == '.' or ch == '-')
-            if num:
-                eps_growth = float(num)
-
-        pe_ratio = None
-        if "P/E ratio" in text:
-            idx = text.find("P/E ratio")
-            snippet = text[idx:idx+40]
-            num = ''.join(ch for ch in snippet if ch.isdigit() or ch == '.' or ch == '-')
-            if num:
-                pe_ratio = float(num)
-
-        return {"pe": pe_ratio, "epsGrowth": eps_growth}
+        exchange = symbol_meta.get_exchange(symbol) or "NASDAQ"
+        url = f"https://www.google.com/finance/quote/{symbol}:{GF_EXCHANGES.get(exchange, exchange)}"
+        with span("provider", "googlefinance"), \
+                requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, stream=True, timeout=15) as r:
+            # החילוץ נמדד כ-cpu; רק קריאת החלקים מהרשת מסומנת כ-I/O (ל---profile-cpu-only)
+            with span("cpu", "googlefinance_extract"):
+                values, _ = extract_googlefinance_fields(metrics.mark_iter(r.iter_content(GF_CHUNK_SIZE)))
+        return {"pe": values.get("pe"), "epsGrowth": values.get("epsGrowth")}
     except Exception:
         return {}
 
 # ---------------- EPS Growth Calculation ----------------
 def calculate_eps_growth(ticker):
     try:
-        hist = ticker.get_earnings_dates(limit=4)
+        with span("provider", "yahoo_earnings_dates"):
+            hist = ticker.get_earnings_dates(limit=4)
         if len(hist) >= 2:
             last_eps = hist["epsactual"].iloc[-1]
             prev_eps = hist["epsactual"].iloc[-2]
@@ -85,7 +168,8 @@ def calculate_eps_growth(ticker):
 # ---------------- Combine All Sources ----------------
 def get_full_fundamentals(symbol):
     ticker = yf.Ticker(symbol)
-    info = ticker.info
+    with span("provider", "yahoo"):
+        info = ticker.info
 
     data = {
         "symbol": symbol,
@@ -113,12 +197,46 @@ def get_full_fundamentals(symbol):
 
     return data
 
+# ---------------- Parallel Fetch ----------------
+def _fetch_one(symbol):
+    # פונקציה ברמת המודול כדי שתהיה ניתנת ל-pickle עבור תהליכי ה-pool.
+    # המדדים של ה-worker חוזרים יחד עם התוצאה וממוזגים בתהליך הראשי.
+    metrics.reset()
+    data = get_full_fundamentals(symbol)
+    return data, metrics.export_raw()
+
+def fetch_all_fundamentals(symbols, workers=1):
+    """
+    מביא פונדמנטלים לכל הסימבולים.
+    workers>1 מחלק את הסימבולים בין תהליכים (ProcessPoolExecutor) כדי שה-HTML parsing וה-pandas
+    ירוצו במקביל על כל הליבות. התוצאות חוזרות באותו סדר של symbols (דטרמיניסטי).
+    """
+    if workers <= 1 or len(symbols) <= 1:
+        results = []
+        for sym in symbols:
+            print(f"🔎 מעבד {sym}...")
+            results.append(get_full_fundamentals(sym))
+        return results
+
+    workers = min(workers, len(symbols))
+    # מנות בגודל סביר – פחות overhead של IPC, ועדיין איזון עומסים בין התהליכים
+    chunksize = max(1, len(symbols) // (workers * 4))
+    print(f"⚙️ מעבד {len(symbols)} מניות ב-{workers} תהליכים (chunksize={chunksize})...")
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for data, raw in pool.map(_fetch_one, symbols, chunksize=chunksize):
+            metrics.merge_raw(raw)
+            results.append(data)
+    return results
+
 # ---------------- Write to Sheet ----------------
-def enrich_to_sheets():
+@timed("stage", "enrich")
+def enrich_to_sheets(workers=1):
     src = get_sheet("StockData")
     dst = get_sheet("Fundamentals")
 
-    rows = src.get_all_values()
+    with span("sheets", "get_all_values"):
+        rows = src.get_all_values()
     if len(rows) < 2:
         print("⚠️ אין נתונים ב-StockData")
         return
@@ -127,16 +245,15 @@ def enrich_to_sheets():
     data = rows[1:]
     idx = {name: i for i, name in enumerate(header)}
 
-    dst.clear()
-    dst.append_row(["Time", "Symbol", "Name", "Price", "P/E", "EPS Growth (%)", "PEG (Formula)"])
+    with span("sheets", "clear"):
+        dst.clear()
+    with span("sheets", "append_row"):
+        dst.append_row(["Time", "Symbol", "Name", "Price", "P/E", "EPS Growth (%)", "PEG (Formula)"])
+
+    symbols = [r[idx.get("Symbol")] for r in data if r[idx.get("Symbol")]]
 
     out_rows = []
-    for r in data:
-        symbol = r[idx.get("Symbol")]
-        if not symbol:
-            continue
-        print(f"🔎 מעבד {symbol}...")
-        fdata = get_full_fundamentals(symbol)
+    for fdata in fetch_all_fundamentals(symbols, workers):
         row = [
             datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             fdata["symbol"], fdata["name"], fdata["price"],
@@ -145,10 +262,21 @@ def enrich_to_sheets():
         out_rows.append(row)
 
     if out_rows:
-        dst.append_rows(out_rows)
+        with span("sheets", "append_rows"):
+            dst.append_rows(out_rows)
         print(f"✅ נכתבו {len(out_rows)} שורות מלאות ל-Fundamentals")
         for i in range(2, len(out_rows) + 2):
-            dst.update_acell(f"G{i}", f"=IFERROR(E{i}/F{i},\"\")")
+            with span("sheets", "update_acell"):
+                dst.update_acell(f"G{i}", f"=IFERROR(E{i}/F{i},\"\")")
 
 if __name__ == "__main__":
-    enrich_to_sheets()
+    parser = argparse.ArgumentParser(description="Enrich StockData symbols into the Fundamentals sheet")
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"number of worker processes (0 = all cores: {os.cpu_count()})")
+    parser.add_argument("--metrics-file", help="dump timing metrics at the end (.prom or .json)")
+    add_profile_args(parser)
+    args = parser.parse_args()
+    if args.profile and args.workers != 1:
+        print("⚠️ ה-profiler דוגם רק את התהליך הראשי – הרץ עם --workers 1 כדי לראות את עבודת ה-workers")
+    run_with_profile(args, enrich_to_sheets, workers=args.workers or os.cpu_count() or 1)
+    metrics.dump(args.metrics_file)
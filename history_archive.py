@@ -0,0 +1,106 @@
+import json
+import sqlite3
+import time
+
+# ===== הגדרות =====
+ARCHIVE_FILE = "history_archive.db"
+
+# ===== חיבור למסד =====
+def _connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS history ("
+        "ts REAL NOT NULL, kind TEXT NOT NULL, symbol TEXT NOT NULL, data TEXT NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_history_symbol ON history (kind, symbol, ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_history_ts ON history (kind, ts)")
+    return conn
+
+def to_float(x):
+    try:
+        if x in ("", None, "N/A"): return None
+        return float(x)
+    except Exception:
+        return None
+
+# ===== כתיבה (append-only) =====
+def append_round(kind, header, rows, ts=None, path=ARCHIVE_FILE, row_ts=None):
+    """
+    מוסיף סבב שלם לארכיון.
+    kind = "stock" (StockData) או "quant" (QuantAnalysis); כל שורה נשמרת כ-dict לפי הכותרות.
+    row_ts = רשימת זמנים לכל שורה (מתי הערכים נצפו בפועל); אחרת כל השורות נשמרות תחת ts.
+    """
+    ts = time.time() if ts is None else ts
+    if "Symbol" not in header:
+        return 0
+    sym_i = header.index("Symbol")
+    stamps = row_ts if row_ts is not None else [ts] * len(rows)
+    records = [
+        (t, kind, str(r[sym_i]), json.dumps(dict(zip(header, r)), default=str))
+        for r, t in zip(rows, stamps) if r[sym_i]
+    ]
+    try:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO history (ts, kind, symbol, data) VALUES (?, ?, ?, ?)", records
+                )
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ לא ניתן לכתוב לארכיון ({path}): {e}")
+        return 0
+    return len(records)
+
+# ===== שאילתות =====
+def query_symbol(symbol, days=90, kind="stock", end=None, path=ARCHIVE_FILE):
+    """סדרת זמן של מניה אחת: [(ts, dict), ...] מהישן לחדש, עבור days הימים האחרונים"""
+    end = time.time() if end is None else end
+    start = end - days * 86400
+    conn = _connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT ts, data FROM history WHERE kind = ? AND symbol = ? AND ts BETWEEN ? AND ? "
+            "ORDER BY ts",
+            (kind, symbol, start, end)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [(ts, json.loads(data)) for ts, data in rows]
+
+def query_cross_section(at=None, kind="stock", path=ARCHIVE_FILE):
+    """חתך רוחב: הרשומה האחרונה של כל מניה נכון לזמן at → {symbol: (ts, dict)}"""
+    at = time.time() if at is None else at
+    conn = _connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT h.symbol, h.ts, h.data FROM history h "
+            "JOIN (SELECT symbol, MAX(ts) AS ts FROM history WHERE kind = ? AND ts <= ? GROUP BY symbol) last "
+            "ON h.symbol = last.symbol AND h.ts = last.ts "
+            "WHERE h.kind = ?",
+            (kind, at, kind)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {sym: (ts, json.loads(data)) for sym, ts, data in rows}
+
+def query_since(since, kind="stock", path=ARCHIVE_FILE):
+    """כל הרשומות שנכתבו אחרי since: [(ts, symbol, dict), ...] מהישן לחדש (לעדכון אינקרמנטלי של צרכנים)"""
+    conn = _connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT ts, symbol, data FROM history WHERE kind = ? AND ts > ? ORDER BY ts",
+            (kind, since)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [(ts, sym, json.loads(data)) for ts, sym, data in rows]
+
+def pct_change_over(symbol, field, days, kind="stock", end=None, path=ARCHIVE_FILE):
+    """שינוי באחוזים בשדה field בין הרשומה הראשונה לאחרונה בחלון של days ימים (מומנטום רב-תקופתי)"""
+    series = [to_float(d.get(field)) for _, d in query_symbol(symbol, days, kind, end, path)]
+    series = [v for v in series if v is not None]
+    if len(series) < 2 or series[0] == 0:
+        return None
+    return (series[-1] - series[0]) / series[0] * 100.0
@@ -0,0 +1,183 @@
+import contextlib
+import functools
+import json
+import threading
+import time
+
+# ===== הגדרות =====
+# גבולות ה-buckets (שניות) – מכסים גם קריאת Sheets מהירה וגם ספק איטי / OpenAI
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# סוגי span שהם המתנה לרשת (ולא חישוב) – ה-profiler יכול לדלג עליהם
+IO_KINDS = ("provider", "sheets", "openai")
+
+_lock = threading.Lock()
+_histograms = {}   # (name, labels) -> {"buckets": [...], "sum": float, "count": int}
+_counters = {}     # (name, labels) -> float
+_active = {}       # thread id -> רשימת ה-kind של ה-spans הפתוחים כרגע
+
+def _key(metric, labels):
+    return metric, tuple(sorted(labels.items()))
+
+# ===== רישום =====
+def observe(metric, value, **labels):
+    """מוסיף תצפית להיסטוגרמה metric"""
+    k = _key(metric, labels)
+    with _lock:
+        h = _histograms.get(k)
+        if h is None:
+            h = _histograms[k] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                h["buckets"][i] += 1
+        h["sum"] += value
+        h["count"] += 1
+
+def inc(metric, value=1, **labels):
+    """מגדיל מונה metric"""
+    k = _key(metric, labels)
+    with _lock:
+        _counters[k] = _counters.get(k, 0) + value
+
+@contextlib.contextmanager
+def mark(kind):
+    """מסמן קטע קוד כ-kind (ל-in_io / ה-profiler) בלי למדוד אותו"""
+    stack = _active.setdefault(threading.get_ident(), [])
+    stack.append(kind)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+@contextlib.contextmanager
+def span(kind, op):
+    """
+    מודד משך של קטע קוד: kind = provider / sheets / stage / cpu / openai, op = הפעולה עצמה.
+    נרשם ל-stockron_span_seconds, וחריגה נספרת ב-stockron_span_errors_total.
+    """
+    t0 = time.perf_counter()
+    with mark(kind):
+        try:
+            yield
+        except BaseException:
+            inc("stockron_span_errors_total", kind=kind, op=op)
+            raise
+        finally:
+            observe("stockron_span_seconds", time.perf_counter() - t0, kind=kind, op=op)
+
+def mark_iter(iterable, kind="provider"):
+    """
+    עוטף iterator שכל next() שלו הוא המתנה לרשת (למשל r.iter_content), כך שבתוך span של cpu
+    רק הקריאות עצמן נחשבות I/O והעיבוד בין החלקים נחשב חישוב
+    """
+    it = iter(iterable)
+    while True:
+        with mark(kind):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
+
+def in_io(thread_id):
+    """האם ה-thread נמצא כרגע ב-I/O – לפי ה-span/mark הפנימי ביותר (cpu בתוך provider נחשב חישוב)"""
+    stack = _active.get(thread_id)
+    return bool(stack) and stack[-1] in IO_KINDS
+
+def timed(kind, op=None):
+    """דקורטור: עוטף את כל הפונקציה ב-span"""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(kind, op or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+def export_raw():
+    """המצב הגולמי (ניתן ל-pickle) – כדי להעביר מדדים מתהליך worker לתהליך הראשי"""
+    with _lock:
+        return {
+            "histograms": {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                           for k, v in _histograms.items()},
+            "counters": dict(_counters),
+        }
+
+def merge_raw(raw):
+    """ממזג מדדים שהגיעו מ-export_raw של תהליך אחר"""
+    with _lock:
+        for k, v in raw["histograms"].items():
+            h = _histograms.get(k)
+            if h is None:
+                _histograms[k] = {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+            else:
+                h["buckets"] = [a + b for a, b in zip(h["buckets"], v["buckets"])]
+                h["sum"] += v["sum"]
+                h["count"] += v["count"]
+        for k, v in raw["counters"].items():
+            _counters[k] = _counters.get(k, 0) + v
+
+# ===== ייצוא =====
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+def render_prometheus():
+    """כל המדדים בפורמט הטקסט של Prometheus (עבור GET /metrics)"""
+    with _lock:
+        hists = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                 for k, v in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    for name in sorted({n for n, _ in hists}):
+        lines.append(f"# TYPE {name} histogram")
+        for (n, labels), h in sorted(hists.items()):
+            if n != name:
+                continue
+            for bound, c in zip(BUCKETS, h["buckets"]):
+                lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', bound)])} {c}")
+            lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {h['count']}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {h['sum']}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {h['count']}")
+    for name in sorted({n for n, _ in counters}):
+        lines.append(f"# TYPE {name} counter")
+        for (n, labels), v in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_fmt_labels(labels)} {v}")
+    return "\n".join(lines) + "\n"
+
+def snapshot():
+    """תקציר קריא: לכל span – count / sum / avg, ולכל מונה – הערך"""
+    with _lock:
+        spans = [
+            {"metric": n, **dict(labels), "count": h["count"], "sum_s": round(h["sum"], 6),
+             "avg_s": round(h["sum"] / h["count"], 6) if h["count"] else None}
+            for (n, labels), h in sorted(_histograms.items())
+        ]
+        counters = [{"metric": n, **dict(labels), "value": v} for (n, labels), v in sorted(_counters.items())]
+    return {"spans": spans, "counters": counters}
+
+def dump(path):
+    """שומר את המדדים לקובץ: .prom → פורמט Prometheus, אחרת JSON"""
+    if not path:
+        return
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".prom"):
+                f.write(render_prometheus())
+            else:
+                json.dump(snapshot(), f, indent=2)
+        print(f"📊 מדדים נשמרו ל-{path}")
+    except OSError as e:
+        print(f"⚠️ לא ניתן לשמור מדדים ({path}): {e}")
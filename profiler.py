@@ -0,0 +1,124 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+import metrics
+
+# ===== הגדרות =====
+DEFAULT_INTERVAL_MS = 5
+DEFAULT_TOP = 25
+
+# ספריות פענוח: דגימה שבה אחת מהן על ה-stack היא חישוב גם בתוך span של רשת
+# (למשל yfinance.get_earnings_dates מוריד ומפענח עם pandas באותה קריאה, בלי נקודת פיצול מבחוץ)
+PARSER_PACKAGES = ("pandas", "lxml", "bs4", "html5lib", "html")
+_PARSER_DIRS = tuple(f"{os.sep}{p}{os.sep}" for p in PARSER_PACKAGES)
+
+# ===== Sampler =====
+class StackSampler:
+    """
+    Profiler דוגם: thread ברקע קורא כל interval את ה-stack של ה-thread הנמדד (sys._current_frames).
+    התקורה קבועה לפי קצב הדגימה ולא לפי מספר הקריאות, כך שאפשר להריץ על דאטה בגודל פרודקשן.
+    cpu_only=True מדלג על דגימות שנלקחו בתוך span של רשת (metrics.IO_KINDS),
+    כך שהמתנה ל-I/O לא מסתירה את נקודות החישוב החמות. span של cpu בתוך span של רשת,
+    ודגימות בתוך ספריות פענוח (PARSER_PACKAGES), נשארות.
+    """
+
+    def __init__(self, interval_ms=DEFAULT_INTERVAL_MS, cpu_only=False):
+        self.interval = interval_ms / 1000.0
+        self.cpu_only = cpu_only
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.skipped_io = 0
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id=None):
+        self._target = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack, parsing = [], False
+            while frame is not None:
+                code = frame.f_code
+                parsing = parsing or any(d in code.co_filename for d in _PARSER_DIRS)
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if self.cpu_only and metrics.in_io(self._target) and not parsing:
+                self.skipped_io += 1
+                continue
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    # ----- פלט -----
+    def write_collapsed(self, path):
+        """קובץ collapsed-stack (פורמט של flamegraph.pl / speedscope / inferno)"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+    def top(self, n=DEFAULT_TOP):
+        """[(func, self_samples, total_samples)] ממוין לפי self"""
+        self_counts = collections.Counter()
+        total_counts = collections.Counter()
+        for stack, c in self.stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += c
+            for fn in set(frames):
+                total_counts[fn] += c
+        return [(fn, c, total_counts[fn]) for fn, c in self_counts.most_common(n)]
+
+    def summary(self, n=DEFAULT_TOP, elapsed=None):
+        lines = [f"samples={self.samples} interval={self.interval * 1000:g}ms"
+                 + (f" skipped_io={self.skipped_io}" if self.cpu_only else "")
+                 + (f" wall={elapsed:.2f}s" if elapsed is not None else "")]
+        lines.append(f"{'self%':>7} {'total%':>7} {'self':>7}  function")
+        total = max(1, self.samples)
+        for fn, s, t in self.top(n):
+            lines.append(f"{s * 100.0 / total:7.2f} {t * 100.0 / total:7.2f} {s:>7}  {fn}")
+        return "\n".join(lines)
+
+# ===== הרצה עם profile =====
+def add_profile_args(parser):
+    """מוסיף ל-argparse את דגלי ה-profiling המשותפים לכל ה-batch scripts"""
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help="run under the sampling profiler; writes PREFIX.collapsed and PREFIX.txt")
+    parser.add_argument("--profile-cpu-only", action="store_true",
+                        help="drop samples taken inside network spans (providers / Sheets / OpenAI)")
+    parser.add_argument("--profile-interval-ms", type=float, default=DEFAULT_INTERVAL_MS)
+    parser.add_argument("--profile-top", type=int, default=DEFAULT_TOP)
+
+def run_with_profile(args, fn, *fn_args, **fn_kwargs):
+    """מריץ את fn; אם ניתן --profile – תחת ה-sampler, ושומר collapsed stacks וסיכום top-N"""
+    if not getattr(args, "profile", None):
+        return fn(*fn_args, **fn_kwargs)
+
+    sampler = StackSampler(args.profile_interval_ms, args.profile_cpu_only)
+    t0 = time.perf_counter()
+    sampler.start()
+    try:
+        return fn(*fn_args, **fn_kwargs)
+    finally:
+        sampler.stop()
+        elapsed = time.perf_counter() - t0
+        out_dir = os.path.dirname(args.profile)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        sampler.write_collapsed(args.profile + ".collapsed")
+        summary = sampler.summary(args.profile_top, elapsed)
+        with open(args.profile + ".txt", "w", encoding="utf-8") as f:
+            f.write(summary + "\n")
+        print(f"\n🔬 Profile נשמר ל-{args.profile}.collapsed / {args.profile}.txt\n{summary}")
@@ -1,13 +1,38 @@
+import argparse
+import hashlib
+import json
 import math
+import os
 import statistics as stats
 import gspread
 from google.oauth2.service_account import Credentials
 from datetime import datetime
+from history_archive import ARCHIVE_FILE, append_round
+import metrics
+from metrics import span, timed
+from profiler import add_profile_args, run_with_profile
+from screener import push_round
 
 # ========= הגדרות =========
 SHEET_ID = "1YTrPFfnpjaJN6r779kYrGxfVSa2zNXCH_RrfLYmSHMM"
 CREDENTIALS_FILE = "credentials.json"
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+STATE_FILE = "quant_state.json"
+# שרת ה-API (GET /screen) שמקבל כל סבב; בלי SCREENER_URL אין push
+SCREENER_URL = os.getenv("SCREENER_URL")
+SCREEN_PUSH_TOKEN = os.getenv("SCREEN_PUSH_TOKEN", "")
+
+# עמודות חובה בקלט
+REQ_COLS = ["Symbol","Name","Sector","Industry","Price","Prev Close","P/E","P/B","P/S","PEG","RSI","Recommendation"]
+
+# כותרות ל-QuantAnalysis
+OUT_HEADER = [
+    "Time","Symbol","Name","Sector","Industry",
+    "Price","% Daily Change","PE","PS","PB","PEG","RSI","TechReco",
+    "PE_z_inSector","PS_z_inSector","PB_z_inSector","PEG_flag",
+    "Score_Value (PE/PEG)","Score_Growth (Δ%)","Score_Tech (RSI/Reco)",
+    "Total_Score (0-9)","Notes"
+]
 
 # ========= כלי עזר =========
 def get_client():
@@ -15,12 +40,13 @@ def get_client():
     return gspread.authorize(creds)
 
 def get_ws(name):
-    client = get_client()
-    ss = client.open_by_key(SHEET_ID)
-    try:
-        return ss.worksheet(name)
-    except gspread.exceptions.WorksheetNotFound:
-        return ss.add_worksheet(title=name, rows=2000, cols=50)
+    with span("sheets", "open"):
+        client = get_client()
+        ss = client.open_by_key(SHEET_ID)
+        try:
+            return ss.worksheet(name)
+        except gspread.exceptions.WorksheetNotFound:
+            return ss.add_worksheet(title=name, rows=2000, cols=50)
 
 def to_float(x):
     try:
@@ -64,13 +90,153 @@ def star_scale(value, good_low=True, cutoffs=(1, 2, 3)):
         if v >= cutoffs[0]: return 1
         return 0
 
+# ========= מצב אינקרמנטלי =========
+def input_hash(r, idx):
+    """טביעת אצבע לשדות הקלט של מניה – אם לא השתנתה, אין צורך לחשב אותה מחדש"""
+    vals = "\x1f".join(str(r[idx[c]]) for c in REQ_COLS)
+    return hashlib.sha1(vals.encode("utf-8")).hexdigest()
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def save_state(state, path=STATE_FILE):
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+    except OSError as e:
+        print(f"⚠️ לא ניתן לשמור מצב quant ({path}): {e}")
+
+def push_to_screener(rows, universe, full_rows=None):
+    """
+    דוחף לשרת את השורות שחושבו בסבב הזה ואת היקום הנוכחי.
+    אם השרת מחזיר needs_full (ה-index שלו חסר, למשל אחרי restart) – שולח את כל הטבלה מ-full_rows().
+    """
+    if not SCREENER_URL:
+        return
+    with span("provider", "screener_push"):
+        resp = push_round(SCREENER_URL, SCREEN_PUSH_TOKEN, OUT_HEADER, rows, universe)
+        if resp and resp.get("needs_full") and full_rows is not None:
+            resp = push_round(SCREENER_URL, SCREEN_PUSH_TOKEN, OUT_HEADER, full_rows(), universe)
+    if resp:
+        print(f"📤 screener עודכן: {resp.get('received')} שורות, {resp.get('universe')} מניות ב-index")
+
+# ========= ניקוד שורה =========
+def score_row(r, idx, sector_buckets):
+    symbol   = r[idx["Symbol"]]
+    name     = r[idx["Name"]]
+    sector   = r[idx["Sector"]] or "UNKNOWN"
+    industry = r[idx["Industry"]] or ""
+    price    = to_float(r[idx["Price"]])
+    prevc    = to_float(r[idx["Prev Close"]])
+    pe       = to_float(r[idx["P/E"]])
+    ps       = to_float(r[idx["P/S"]])
+    pb       = to_float(r[idx["P/B"]])
+    peg      = to_float(r[idx["PEG"]])
+    rsi      = to_float(r[idx["RSI"]])  # יכול להיות None
+    reco     = r[idx["Recommendation"]] if r[idx["Recommendation"]] else "N/A"
+
+    # 1) שינוי יומי
+    pct_day = safe_pct_change(price, prevc)
+
+    # 2) Z-score בסקטור עבור מכפילים (נמוך עדיף)
+    pe_z  = zscore(pe,  sector_buckets[sector]["pe"])
+    ps_z  = zscore(ps,  sector_buckets[sector]["ps"])
+    pb_z  = zscore(pb,  sector_buckets[sector]["pb"])
+
+    # 3) דגל PEG: <1 נחשב טוב, 1–2 בינוני, >2 חלש, None = לא ידוע
+    if peg is None:
+        peg_flag = "N/A"
+    elif peg < 1:
+        peg_flag = "Good(<1)"
+    elif peg <= 2:
+        peg_flag = "Mid(1-2)"
+    else:
+        peg_flag = "High(>2)"
+
+    # 4) ניקוד: Value (PE/PEG), Growth (שינוי יומי כללי כ-proxy), Tech (RSI+המלצה)
+    # Value: משתמשים ב-Z ל-PE (נמוך=טוב) וב-PEG ישיר (נמוך=טוב)
+    value_stars_pe  = star_scale(abs(pe_z) if pe_z is not None else None, good_low=True,  cutoffs=(0.5,1.0,1.5))
+    value_stars_peg = star_scale(peg if peg is not None else None,      good_low=True,  cutoffs=(1.0,1.5,2.0))
+    score_value = min(3, (value_stars_pe + value_stars_peg))  # 0–3
+
+    # Growth: שינוי יומי – גבוה יותר עדיף (פשוט ל-MVP)
+    growth_stars = star_scale(pct_day if pct_day is not None else None, good_low=False, cutoffs=(0.5,1.0,2.0))  # % שינוי
+    score_growth = growth_stars  # 0–3
+
+    # Tech: RSI באזור 50=ניטרלי; רחוק מ-50 פחות טוב. Reco של TV מוסיף נקודה אם BUY/STRONG_BUY
+    tech_rsi_stars = None
+    if rsi is None:
+        tech_rsi_stars = 1  # ניטרלי אם חסר
+    else:
+        # קרוב ל-50 טוב: סטייה קטנה = יותר כוכבים
+        dev = abs(rsi - 50)
+        # 0–10 -> 3*, 10–20 -> 2*, 20–30 -> 1*, >30 -> 0
+        if dev <= 10: tech_rsi_stars = 3
+        elif dev <= 20: tech_rsi_stars = 2
+        elif dev <= 30: tech_rsi_stars = 1
+        else: tech_rsi_stars = 0
+
+    reco_bonus = 0
+    if isinstance(reco, str):
+        reco_u = reco.upper()
+        if "STRONG_BUY" in reco_u or reco_u == "BUY":
+            reco_bonus = 1
+        elif reco_u == "SELL" or "STRONG_SELL" in reco_u:
+            reco_bonus = 0
+    score_tech = min(3, tech_rsi_stars + reco_bonus)  # 0–3
+
+    total = (score_value or 0) + (score_growth or 0) + (score_tech or 0)  # 0–9
+
+    notes = []
+    if pe is None: notes.append("PE missing")
+    if peg is None: notes.append("PEG missing/NA")
+    if rsi is None: notes.append("RSI NA")
+    note_str = "; ".join(notes) if notes else ""
+
+    return [
+        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        symbol, name, sector, industry,
+        price, None if pct_day is None else round(pct_day, 2),
+        pe, ps, pb, peg, rsi, reco,
+        None if pe_z is None else round(pe_z, 2),
+        None if ps_z is None else round(ps_z, 2),
+        None if pb_z is None else round(pb_z, 2),
+        peg_flag,
+        score_value, score_growth, score_tech,
+        total, note_str
+    ]
+
 # ========= חישוב עיקרי =========
-def run_quant():
+def build_sector_buckets(data, idx):
+    """אוספים לחישובי ממוצעי סקטור (ל־Z-score)"""
+    sector_buckets = {}
+    for r in data:
+        sector = r[idx["Sector"]] or "UNKNOWN"
+        sector_buckets.setdefault(sector, {"pe": [], "ps": [], "pb": [], "peg": [], "price": []})
+        sector_buckets[sector]["pe"].append(r[idx["P/E"]])
+        sector_buckets[sector]["ps"].append(r[idx["P/S"]])
+        sector_buckets[sector]["pb"].append(r[idx["P/B"]])
+        sector_buckets[sector]["peg"].append(r[idx["PEG"]])
+        sector_buckets[sector]["price"].append(r[idx["Price"]])
+    return sector_buckets
+
+@timed("stage", "quant")
+def run_quant(incremental=False, archive_path=ARCHIVE_FILE, state_path=STATE_FILE):
+    """
+    בונה את QuantAnalysis מתוך StockData.
+    incremental=True: מחשב מחדש רק מניות שהקלט שלהן השתנה (לפי hash) ואת עמיתיהן בסקטור,
+    ומעדכן רק את השורות המושפעות בגיליון. אם המצב הקודם לא תואם לגיליון – נופל לבנייה מלאה.
+    """
     src = get_ws("StockData")
     dst = get_ws("QuantAnalysis")
 
     # קריאת כל הנתונים מהטבלה החיה
-    rows = src.get_all_values()
+    with span("sheets", "get_all_values"):
+        rows = src.get_all_values()
     if not rows or len(rows) < 2:
         print("⚠️ אין נתונים ב-StockData")
         return
@@ -82,126 +248,121 @@ def run_quant():
     idx = {name: i for i, name in enumerate(header)}
 
     # עמודות חובה בקלט
-    req_cols = ["Symbol","Name","Sector","Industry","Price","Prev Close","P/E","P/B","P/S","PEG","RSI","Recommendation"]
-    missing_cols = [c for c in req_cols if c not in idx]
+    missing_cols = [c for c in REQ_COLS if c not in idx]
     if missing_cols:
         print("⚠️ חסרות עמודות ב-StockData:", missing_cols)
         return
 
-    # נבנה אוספים לחישובי ממוצעי סקטור (ל־Z-score)
-    sector_buckets = {}
-    for r in data:
-        sector = r[idx["Sector"]] or "UNKNOWN"
-        sector_buckets.setdefault(sector, {"pe": [], "ps": [], "pb": [], "peg": [], "price": []})
-        sector_buckets[sector]["pe"].append(r[idx["P/E"]])
-        sector_buckets[sector]["ps"].append(r[idx["P/S"]])
-        sector_buckets[sector]["pb"].append(r[idx["P/B"]])
-        sector_buckets[sector]["peg"].append(r[idx["PEG"]])
-        sector_buckets[sector]["price"].append(r[idx["Price"]])
+    sector_buckets = build_sector_buckets(data, idx)
 
-    # כתובת כותרות ל-QuantAnalysis
-    out_header = [
-        "Time","Symbol","Name","Sector","Industry",
-        "Price","% Daily Change","PE","PS","PB","PEG","RSI","TechReco",
-        "PE_z_inSector","PS_z_inSector","PB_z_inSector","PEG_flag",
-        "Score_Value (PE/PEG)","Score_Growth (Δ%)","Score_Tech (RSI/Reco)",
-        "Total_Score (0-9)","Notes"
-    ]
-    dst.clear()
-    dst.append_row(out_header)
+    new_state = {
+        r[idx["Symbol"]]: {"hash": input_hash(r, idx), "sector": r[idx["Sector"]] or "UNKNOWN"}
+        for r in data if r[idx["Symbol"]]
+    }
 
-    out_rows = []
-    for r in data:
-        symbol   = r[idx["Symbol"]]
-        name     = r[idx["Name"]]
-        sector   = r[idx["Sector"]] or "UNKNOWN"
-        industry = r[idx["Industry"]] or ""
-        price    = to_float(r[idx["Price"]])
-        prevc    = to_float(r[idx["Prev Close"]])
-        pe       = to_float(r[idx["P/E"]])
-        ps       = to_float(r[idx["P/S"]])
-        pb       = to_float(r[idx["P/B"]])
-        peg      = to_float(r[idx["PEG"]])
-        rsi      = to_float(r[idx["RSI"]])  # יכול להיות None
-        reco     = r[idx["Recommendation"]] if r[idx["Recommendation"]] else "N/A"
-
-        # 1) שינוי יומי
-        pct_day = safe_pct_change(price, prevc)
-
-        # 2) Z-score בסקטור עבור מכפילים (נמוך עדיף)
-        pe_z  = zscore(pe,  sector_buckets[sector]["pe"])
-        ps_z  = zscore(ps,  sector_buckets[sector]["ps"])
-        pb_z  = zscore(pb,  sector_buckets[sector]["pb"])
-
-        # 3) דגל PEG: <1 נחשב טוב, 1–2 בינוני, >2 חלש, None = לא ידוע
-        if peg is None:
-            peg_flag = "N/A"
-        elif peg < 1:
-            peg_flag = "Good(<1)"
-        elif peg <= 2:
-            peg_flag = "Mid(1-2)"
-        else:
-            peg_flag = "High(>2)"
-
-        # 4) ניקוד: Value (PE/PEG), Growth (שינוי יומי כללי כ-proxy), Tech (RSI+המלצה)
-        # Value: משתמשים ב-Z ל-PE (נמוך=טוב) וב-PEG ישיר (נמוך=טוב)
-        value_stars_pe  = star_scale(abs(pe_z) if pe_z is not None else None, good_low=True,  cutoffs=(0.5,1.0,1.5))
-        value_stars_peg = star_scale(peg if peg is not None else None,      good_low=True,  cutoffs=(1.0,1.5,2.0))
-        score_value = min(3, (value_stars_pe + value_stars_peg))  # 0–3
-
-        # Growth: שינוי יומי – גבוה יותר עדיף (פשוט ל-MVP)
-        growth_stars = star_scale(pct_day if pct_day is not None else None, good_low=False, cutoffs=(0.5,1.0,2.0))  # % שינוי
-        score_growth = growth_stars  # 0–3
-
-        # Tech: RSI באזור 50=ניטרלי; רחוק מ-50 פחות טוב. Reco של TV מוסיף נקודה אם BUY/STRONG_BUY
-        tech_rsi_stars = None
-        if rsi is None:
-            tech_rsi_stars = 1  # ניטרלי אם חסר
-        else:
-            # קרוב ל-50 טוב: סטייה קטנה = יותר כוכבים
-            dev = abs(rsi - 50)
-            # 0–10 -> 3*, 10–20 -> 2*, 20–30 -> 1*, >30 -> 0
-            if dev <= 10: tech_rsi_stars = 3
-            elif dev <= 20: tech_rsi_stars = 2
-            elif dev <= 30: tech_rsi_stars = 1
-            else: tech_rsi_stars = 0
-
-        reco_bonus = 0
-        if isinstance(reco, str):
-            reco_u = reco.upper()
-            if "STRONG_BUY" in reco_u or reco_u == "BUY":
-                reco_bonus = 1
-            elif reco_u == "SELL" or "STRONG_SELL" in reco_u:
-                reco_bonus = 0
-        score_tech = min(3, tech_rsi_stars + reco_bonus)  # 0–3
-
-        total = (score_value or 0) + (score_growth or 0) + (score_tech or 0)  # 0–9
-
-        notes = []
-        if pe is None: notes.append("PE missing")
-        if peg is None: notes.append("PEG missing/NA")
-        if rsi is None: notes.append("RSI NA")
-        note_str = "; ".join(notes) if notes else ""
-
-        out_rows.append([
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            symbol, name, sector, industry,
-            price, None if pct_day is None else round(pct_day, 2),
-            pe, ps, pb, peg, rsi, reco,
-            None if pe_z is None else round(pe_z, 2),
-            None if ps_z is None else round(ps_z, 2),
-            None if pb_z is None else round(pb_z, 2),
-            peg_flag,
-            score_value, score_growth, score_tech,
-            total, note_str
-        ])
+    if incremental and run_incremental(dst, data, idx, sector_buckets, new_state,
+                                       load_state(state_path), archive_path, state_path):
+        return
+
+    with span("sheets", "clear"):
+        dst.clear()
+    with span("sheets", "append_row"):
+        dst.append_row(OUT_HEADER)
+
+    with span("cpu", "score_rows"):
+        out_rows = [score_row(r, idx, sector_buckets) for r in data]
 
     # כתיבה מרוכזת
     if out_rows:
-        dst.append_rows(out_rows, value_input_option="RAW")
+        with span("sheets", "append_rows"):
+            dst.append_rows(out_rows, value_input_option="RAW")
+        # המצב נשמר לפני הארכיון: צרכן של הארכיון (screener) שרואה שורות חדשות
+        # צריך למצוא כבר את היקום החדש, אחרת הוא יסיר מניות שזה עתה נוספו
+        save_state(new_state, state_path)
+        append_round("quant", OUT_HEADER, out_rows, path=archive_path)
+        push_to_screener(out_rows, new_state)
         print(f"✅ QuantAnalysis נבנה: {len(out_rows)} שורות")
     else:
         print("⚠️ לא נמצאו שורות לניתוח")
 
+def run_incremental(dst, data, idx, sector_buckets, new_state, old_state, archive_path, state_path=STATE_FILE):
+    """
+    מעדכן רק את השורות המושפעות. מחזיר False אם צריך בנייה מלאה
+    (אין מצב קודם, או שהגיליון לא תואם למצב שנשמר). כשמחזיר True – new_state כבר נשמר.
+    """
+    if not old_state:
+        return False
+
+    with span("sheets", "get_all_values"):
+        existing = dst.get_all_values()
+    if not existing or existing[0] != OUT_HEADER:
+        return False
+    sym_col = OUT_HEADER.index("Symbol")
+    # מספר שורה בגיליון (1-based, כולל כותרת) לכל מניה
+    sheet_rows = {r[sym_col]: i + 2 for i, r in enumerate(existing[1:]) if len(r) > sym_col}
+    if set(sheet_rows) != set(old_state):
+        return False
+
+    changed = {s for s, st in new_state.items() if old_state.get(s, {}).get("hash") != st["hash"]}
+    removed = set(old_state) - set(new_state)
+    def full_rows(updated=()):
+        """כל הטבלה הנוכחית: השורות הקיימות בגיליון, עם השורות שחושבו עכשיו במקומן"""
+        table = {r[sym_col]: r for r in existing[1:] if len(r) > sym_col and r[sym_col] in new_state}
+        table.update({r[sym_col]: r for r in updated})
+        return list(table.values())
+
+    if not changed and not removed:
+        save_state(new_state, state_path)
+        # בלי שורות חדשות – רק כדי שהשרת יבקש טבלה מלאה אם ה-index שלו ריק
+        push_to_screener([], new_state, full_rows)
+        print("✅ QuantAnalysis מעודכן – אין שינויים בקלט")
+        return True
+
+    # סקטורים מושפעים: הסקטור הנוכחי והקודם של כל מניה שהשתנתה/נמחקה (ה-Z-score תלוי בכל העמיתים)
+    sectors = {new_state[s]["sector"] for s in changed}
+    sectors |= {old_state[s]["sector"] for s in changed | removed if s in old_state}
+
+    with span("cpu", "score_rows"):
+        out_rows = [
+            score_row(r, idx, sector_buckets) for r in data
+            if r[idx["Symbol"]] and (r[idx["Sector"]] or "UNKNOWN") in sectors
+        ]
+
+    last_col = gspread.utils.rowcol_to_a1(1, len(OUT_HEADER)).rstrip("1")
+    updates, appends = [], []
+    for row in out_rows:
+        n = sheet_rows.get(row[sym_col])
+        if n is None:
+            appends.append(row)
+        else:
+            updates.append({"range": f"A{n}:{last_col}{n}", "values": [row]})
+
+    if updates:
+        with span("sheets", "batch_update"):
+            dst.batch_update(updates, value_input_option="RAW")
+    if appends:
+        with span("sheets", "append_rows"):
+            dst.append_rows(appends, value_input_option="RAW")
+    # מחיקה מהסוף להתחלה כדי שמספרי השורות לא יזוזו
+    for n in sorted((sheet_rows[s] for s in removed), reverse=True):
+        with span("sheets", "delete_rows"):
+            dst.delete_rows(n)
+
+    # כמו בבנייה המלאה: מצב לפני ארכיון
+    save_state(new_state, state_path)
+    if out_rows:
+        append_round("quant", OUT_HEADER, out_rows, path=archive_path)
+    push_to_screener(out_rows, new_state, lambda: full_rows(out_rows))
+    print(f"✅ QuantAnalysis עודכן חלקית: {len(changed)} מניות שהשתנו, "
+          f"{len(out_rows)} שורות חושבו מחדש, {len(removed)} הוסרו")
+    return True
+
 if __name__ == "__main__":
-    run_quant()
+    parser = argparse.ArgumentParser(description="Quant scoring over StockData")
+    parser.add_argument("--incremental", action="store_true",
+                        help="rescore only symbols whose inputs changed (plus their sector peers)")
+    parser.add_argument("--metrics-file", help="dump timing metrics at the end (.prom or .json)")
+    add_profile_args(parser)
+    args = parser.parse_args()
+    run_with_profile(args, run_quant, incremental=args.incremental)
+    metrics.dump(args.metrics_file)
@@ -0,0 +1,277 @@
+import argparse
+import bisect
+import json
+import os
+import threading
+import time
+
+from history_archive import ARCHIVE_FILE, query_cross_section, query_since, to_float
+
+# ===== הגדרות =====
+# quant_engine שומר כאן את רשימת המניות הנוכחית (ומכאן יודעים אילו מניות הוסרו)
+QUANT_STATE_FILE = "quant_state.json"
+# כל כמה שניות לכל היותר לבדוק אם run_quant כתב סבב חדש לארכיון
+REFRESH_SECONDS = 30
+DEFAULT_TOP_K = 20
+MAX_TOP_K = 500
+# run_quant דוחף כל סבב לשרת (כשהשרת לא רואה את הארכיון, למשל ב-Render)
+PUSH_PATH = "/screen/push"
+PUSH_TIMEOUT = 30
+
+# עמודות QuantAnalysis → שדות ב-index
+FIELDS = {
+    "Symbol": "symbol",
+    "Name": "name",
+    "Sector": "sector",
+    "Industry": "industry",
+    "Price": "price",
+    "PEG": "peg",
+    "PEG_flag": "peg_flag",
+    "PE_z_inSector": "pe_z",
+    "PS_z_inSector": "ps_z",
+    "PB_z_inSector": "pb_z",
+    "Score_Value (PE/PEG)": "score_value",
+    "Score_Growth (Δ%)": "score_growth",
+    "Score_Tech (RSI/Reco)": "score_tech",
+    "Total_Score (0-9)": "total_score",
+    "Time": "scored_at",
+}
+NUMERIC_FIELDS = ("price", "peg", "pe_z", "ps_z", "pb_z", "score_value", "score_growth", "score_tech", "total_score")
+
+# קיצורים לדגל ה-PEG של quant_engine
+PEG_FLAGS = {"good": "Good(<1)", "mid": "Mid(1-2)", "high": "High(>2)", "na": "N/A"}
+
+def parse_peg_flags(value):
+    """'good,mid' / 'Good(<1)' → {"Good(<1)", "Mid(1-2)"}; None/ריק → None (בלי סינון)"""
+    if not value:
+        return None
+    out = set()
+    for part in value.split(","):
+        part = part.strip()
+        if part:
+            out.add(PEG_FLAGS.get(part.lower(), part))
+    return out or None
+
+def to_entry(record):
+    """dict של שורת QuantAnalysis (מהארכיון) → רשומת index"""
+    entry = {field: record.get(col) for col, field in FIELDS.items()}
+    for field in NUMERIC_FIELDS:
+        entry[field] = to_float(entry[field])
+    entry["sector"] = entry["sector"] or "UNKNOWN"
+    return entry
+
+def _rank_key(entry):
+    # ציון גבוה קודם; שוויון → לפי סימבול
+    return (-(entry["total_score"] or 0.0), entry["symbol"])
+
+# ===== Index =====
+class ScreenIndex:
+    """
+    index מדורג בזיכרון של ציוני ה-quant האחרונים.
+    רשימה ממוינת אחת לכל היקום ואחת לכל סקטור (לפי Total_Score יורד), כך ש-top-K
+    עם סינון סקטור / טווח ציון הוא bisect + סריקה קצרה, בלי לקרוא את Sheets.
+    מתעדכן אינקרמנטלית: רק מניות שחושבו מחדש בסבב quant האחרון נכנסות מחדש.
+    """
+
+    def __init__(self):
+        self._entries = {}      # symbol -> entry
+        self._ranked = []       # [(rank_key, symbol)] ממוין
+        self._by_sector = {}    # sector.lower() -> [(rank_key, symbol)] ממוין
+        self._lock = threading.Lock()
+        self.last_ts = None     # ה-ts של הסבב האחרון שנקלט מהארכיון
+        self.updated_at = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ----- עדכון -----
+    def _unlink(self, symbol):
+        old = self._entries.pop(symbol, None)
+        if old is None:
+            return
+        key = (_rank_key(old), symbol)
+        for lst in (self._ranked, self._by_sector.get(old["sector"].lower(), [])):
+            i = bisect.bisect_left(lst, key)
+            if i < len(lst) and lst[i] == key:
+                del lst[i]
+
+    def upsert(self, entries):
+        with self._lock:
+            for e in entries:
+                sym = e["symbol"]
+                if not sym:
+                    continue
+                self._unlink(sym)
+                self._entries[sym] = e
+                key = (_rank_key(e), sym)
+                bisect.insort(self._ranked, key)
+                bisect.insort(self._by_sector.setdefault(e["sector"].lower(), []), key)
+            self.updated_at = time.time()
+
+    def remove(self, symbols):
+        with self._lock:
+            for sym in symbols:
+                self._unlink(sym)
+            self.updated_at = time.time()
+
+    def retain(self, symbols):
+        """משאיר רק את symbols (היקום הנוכחי של quant); מחזיר כמה הוסרו"""
+        stale = [s for s in self._entries if s not in symbols]
+        if stale:
+            self.remove(stale)
+        return len(stale)
+
+    # ----- שאילתה -----
+    def query(self, k=DEFAULT_TOP_K, sector=None, min_score=None, max_score=None, peg_flags=None):
+        """top-K לפי Total_Score, עם סינון אופציונלי לסקטור, טווח ציון [min, max] ודגלי PEG"""
+        with self._lock:
+            lst = self._ranked if sector is None else self._by_sector.get(sector.lower(), [])
+            # הרשימה ממוינת לפי -score, כך שטווח הציונים הוא קטע רציף
+            start = 0 if max_score is None else bisect.bisect_left(lst, ((-max_score, ""),))
+            out = []
+            for i in range(start, len(lst)):
+                (neg_score, _), sym = lst[i]
+                if min_score is not None and -neg_score < min_score:
+                    break
+                e = self._entries[sym]
+                if peg_flags is not None and e["peg_flag"] not in peg_flags:
+                    continue
+                rank = i + 1 if lst is self._ranked else bisect.bisect_left(self._ranked, lst[i]) + 1
+                out.append(dict(e, rank=rank))
+                if len(out) >= k:
+                    break
+            return out
+
+# ===== טעינה מהארכיון =====
+def load_universe(state_path=QUANT_STATE_FILE):
+    """הסימבולים שב-QuantAnalysis כרגע (לפי quant_state.json); None אם אין קובץ"""
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            return set(json.load(f))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+class Screener:
+    """
+    ScreenIndex שמסתנכרן עם run_quant דרך ארכיון ההיסטוריה:
+    טעינה ראשונה = חתך הרוחב האחרון של kind="quant", ואחריה רק הרשומות שנוספו מאז (query_since).
+    מניות שירדו מהיקום מוסרות לפי quant_state.json.
+    """
+
+    def __init__(self, archive_path=ARCHIVE_FILE, state_path=QUANT_STATE_FILE, refresh_seconds=REFRESH_SECONDS):
+        self.archive_path = archive_path
+        self.state_path = state_path
+        self.refresh_seconds = refresh_seconds
+        self.index = ScreenIndex()
+        self._checked_at = 0.0
+        self._state_mtime = None
+        self._row_ts = {}       # symbol -> ts של שורת הארכיון האחרונה שנקלטה
+        self._pushed_at = None
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def as_of(self):
+        """epoch של הסבב האחרון שנקלט – מהארכיון או מ-push"""
+        stamps = [t for t in (self.index.last_ts, self._pushed_at) if t is not None]
+        return max(stamps) if stamps else None
+
+    def refresh(self):
+        """קולט סבבי quant חדשים מהארכיון; מחזיר כמה מניות עודכנו"""
+        with self._refresh_lock:
+            self._checked_at = time.monotonic()
+            if not os.path.exists(self.archive_path):
+                return 0
+            if self.index.last_ts is None:
+                latest = query_cross_section(kind="quant", path=self.archive_path)
+                records = [(ts, sym, data) for sym, (ts, data) in latest.items()]
+            else:
+                records = query_since(self.index.last_ts, kind="quant", path=self.archive_path)
+            if records:
+                self.index.upsert(to_entry(data) for _, _, data in records)
+                self.index.last_ts = max(ts for ts, _, _ in records)
+                for ts, sym, _ in records:
+                    self._row_ts[sym] = ts
+
+            # הסרות: רק כשקובץ המצב השתנה (או בטעינה הראשונה)
+            try:
+                mtime = os.stat(self.state_path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime is not None and (mtime != self._state_mtime or records):
+                universe = load_universe(self.state_path)
+                if universe is not None:
+                    # מניה ששורתה בארכיון חדשה מקובץ המצב נוספה בסבב שהמצב שלו עוד לא נכתב – לא מסירים
+                    universe |= {s for s, ts in self._row_ts.items() if ts > mtime}
+                    self.index.retain(universe)
+                    self._row_ts = {s: ts for s, ts in self._row_ts.items() if s in universe}
+                self._state_mtime = mtime
+            return len(records)
+
+    def apply_push(self, records, universe=None):
+        """
+        סבב שנדחף מ-run_quant: records = שורות QuantAnalysis (dict לפי הכותרות) שחושבו מחדש,
+        universe = כל הסימבולים הנוכחיים (מניות שאינן בו מוסרות).
+        needs_full=True אם ב-index חסרות מניות מהיקום (למשל אחרי restart) – ה-pusher ישלח את כל הטבלה.
+        """
+        with self._refresh_lock:
+            entries = [to_entry(r) for r in records]
+            self.index.upsert(entries)
+            if universe is not None:
+                universe = set(universe) | {e["symbol"] for e in entries}
+                self.index.retain(universe)
+            self._pushed_at = time.time()
+            missing = 0 if universe is None else len(universe) - len(self.index)
+            return {"received": len(entries), "universe": len(self.index), "needs_full": missing > 0}
+
+    def maybe_refresh(self):
+        """refresh אם עברו refresh_seconds מהבדיקה האחרונה (זול כשאין סבב חדש)"""
+        if time.monotonic() - self._checked_at >= self.refresh_seconds:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ רענון ה-screener נכשל: {e}")
+
+    def screen(self, **filters):
+        self.maybe_refresh()
+        return self.index.query(**filters)
+
+# ===== push מ-run_quant =====
+def push_round(url, token, header, rows, universe):
+    """
+    שולח סבב quant ל-POST /screen/push של השרת. מחזיר את תשובת השרת (dict) או None בשגיאה –
+    כשל ב-push לא מפיל את run_quant.
+    """
+    import requests  # רק בצד ה-pusher; השרת לא צריך את הייבוא הזה בזמן עלייה
+    payload = {
+        "rows": [dict(zip(header, r)) for r in rows],
+        "universe": list(universe),
+    }
+    try:
+        r = requests.post(url.rstrip("/") + PUSH_PATH, json=payload, timeout=PUSH_TIMEOUT,
+                          headers={"Authorization": f"Bearer {token}"})
+        r.raise_for_status()
+        return r.json()
+    except Exception as e:
+        print(f"⚠️ לא ניתן לדחוף את סבב ה-quant ל-screener ({url}): {e}")
+        return None
+
+# ===== הרצה =====
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Top-K screen over the latest QuantAnalysis scores")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--sector")
+    parser.add_argument("--min-score", type=float)
+    parser.add_argument("--max-score", type=float)
+    parser.add_argument("--peg", help="comma-separated PEG flags: good, mid, high, na")
+    parser.add_argument("--archive", default=ARCHIVE_FILE)
+    parser.add_argument("--state", default=QUANT_STATE_FILE)
+    args = parser.parse_args()
+
+    screener = Screener(args.archive, args.state)
+    screener.refresh()
+    rows = screener.screen(k=args.top, sector=args.sector, min_score=args.min_score,
+                           max_score=args.max_score, peg_flags=parse_peg_flags(args.peg))
+    print(f"🔎 {len(rows)} / {len(screener.index)} מניות")
+    for r in rows:
+        print(f"{r['symbol']:<8} {r['total_score'] or 0:>4.0f}  V{r['score_value'] or 0:.0f} "
+              f"G{r['score_growth'] or 0:.0f} T{r['score_tech'] or 0:.0f}  {r['peg_flag']:<9} {r['sector']}")
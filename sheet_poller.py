@@ -1,9 +1,16 @@
+import argparse
 import time
 import requests
 import yfinance as yf
 import gspread
 from google.oauth2.service_account import Credentials
 from tradingview_ta import TA_Handler, Interval
+from snapshot_store import SNAPSHOT_FILE, load_snapshot, save_snapshot, is_fresh
+from history_archive import ARCHIVE_FILE, append_round
+import metrics
+from metrics import span, timed
+from watchlist import (WATCHLIST_TAB, DEFAULT_WATCHLIST, parse_watchlist_rows, load_watchlist_file,
+                       diff_universe, symbol_meta)
 
 # ===== הגדרות =====
 SHEET_ID = "1YTrPFfnpjaJN6r779kYrGxfVSa2zNXCH_RrfLYmSHMM"
@@ -13,20 +20,26 @@ SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
 # ===== חיבור לשיטס =====
 def get_sheet(name="StockData"):
-    creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
-    client = gspread.authorize(creds)
-    try:
-        return client.open_by_key(SHEET_ID).worksheet(name)
-    except gspread.exceptions.WorksheetNotFound:
-        sheet = client.open_by_key(SHEET_ID).add_worksheet(title=name, rows=1000, cols=20)
-        return sheet
+    return open_or_create_sheet(name)[0]
+
+def open_or_create_sheet(name):
+    """(worksheet, created) – created=True רק אם הטאב לא היה קיים ונוצר עכשיו"""
+    with span("sheets", "open"):
+        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
+        client = gspread.authorize(creds)
+        try:
+            return client.open_by_key(SHEET_ID).worksheet(name), False
+        except gspread.exceptions.WorksheetNotFound:
+            sheet = client.open_by_key(SHEET_ID).add_worksheet(title=name, rows=1000, cols=20)
+            return sheet, True
 
 # ===== מקור נתונים מ-FMP =====
 def get_from_fmp(symbol):
     url = f"https://financialmodelingprep.com/api/v3/profile/{symbol}?apikey={API_KEY_FMP}"
     try:
-        response = requests.get(url)
-        data = response.json()
+        with span("provider", "fmp"):
+            response = requests.get(url)
+            data = response.json()
         if isinstance(data, list) and len(data) > 0:
             d = data[0]
             return {
@@ -46,12 +59,8 @@ def get_from_fmp(symbol):
 def get_from_tradingview(symbol):
     """מביא אינדיקטורים טכניים מ-TradingView עם התאמה אוטומטית לבורסה"""
     try:
-        # זיהוי בורסה לפי סימול
-        exchange = "NASDAQ"
-        if symbol in ["PLX", "POET"]:
-            exchange = "AMEX"
-        elif symbol in ["TSLA", "NVDA", "AAPL"]:
-            exchange = "NASDAQ"
+        # הבורסה מגיעה מאינדקס המטא-דאטה (רשימת המעקב / Yahoo), ברירת מחדל NASDAQ
+        exchange = symbol_meta.get_exchange(symbol) or "NASDAQ"
 
         handler = TA_Handler(
             symbol=symbol,
@@ -60,7 +69,8 @@ def get_from_tradingview(symbol):
             interval=Interval.INTERVAL_1_DAY
         )
 
-        analysis = handler.get_analysis()
+        with span("provider", "tradingview"):
+            analysis = handler.get_analysis()
         indicators = analysis.indicators
 
         return {
@@ -76,7 +86,9 @@ def get_from_tradingview(symbol):
 # ===== שילוב מקורות =====
 def get_full_stock_data(symbol):
     ticker = yf.Ticker(symbol)
-    info = ticker.info
+    with span("provider", "yahoo"):
+        info = ticker.info
+    symbol_meta.resolve_from_yahoo(symbol, info.get("exchange"))
 
     data = {
         "symbol": symbol,
@@ -112,8 +124,26 @@ def get_full_stock_data(symbol):
 
     return data
 
+# ===== מטמון מקומי (snapshot) =====
+# {symbol: {"fetched_at": epoch, "data": dict}} – נטען מהדיסק בעלייה כדי שה-Poller יתחיל "חם"
+_cache = {}
+
+def warm_start(path=SNAPSHOT_FILE):
+    """טוען את הסבב האחרון שנשמר למטמון בזיכרון"""
+    _cache.clear()
+    _cache.update(load_snapshot(path))
+    if _cache:
+        print(f"♻️ נטענו {len(_cache)} מניות מה-snapshot המקומי")
+    return _cache
+
 # ===== כתיבה לשיטס =====
-def update_stockdata(symbols):
+@timed("stage", "poll_round")
+def update_stockdata(symbols, max_age_seconds=0, snapshot_path=SNAPSHOT_FILE, archive_path=ARCHIVE_FILE):
+    """
+    כותב סבב מלא ל-StockData.
+    מניות שנמצאות במטמון וצעירות מ-max_age_seconds לא נמשכות מחדש מהספקים.
+    בסוף הסבב המטמון נשמר לדיסק והסבב נוסף לארכיון ההיסטורי.
+    """
     sheet = get_sheet("StockData")
 
     header = [
@@ -123,14 +153,26 @@ def update_stockdata(symbols):
         "Sector", "Industry",
         "RSI", "MACD", "Recommendation"
     ]
-    sheet.clear()
-    sheet.append_row(header)
+    with span("sheets", "clear"):
+        sheet.clear()
+    with span("sheets", "append_row"):
+        sheet.append_row(header)
 
     rows = []
+    fetched = []  # (row, fetched_at) של מניות שנמשכו בסבב הזה – רק הן נכנסות לארכיון
+    reused = 0
     for sym in symbols:
-        stock = get_full_stock_data(sym)
+        entry = _cache.get(sym)
+        fresh = is_fresh(entry, max_age_seconds)
+        if fresh:
+            reused += 1
+        else:
+            entry = {"fetched_at": time.time(), "data": get_full_stock_data(sym)}
+            _cache[sym] = entry
+            print(f"✅ עודכנה מניה: {sym}")
+        stock = entry["data"]
         row = [
-            time.strftime("%Y-%m-%d %H:%M:%S"),
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["fetched_at"])),
             stock.get("symbol"),
             stock.get("name"),
             stock.get("price"),
@@ -153,22 +195,108 @@ def update_stockdata(symbols):
             stock.get("recommendation")
         ]
         rows.append(row)
-        print(f"✅ עודכנה מניה: {sym}")
+        if not fresh:
+            fetched.append((row, entry["fetched_at"]))
 
-    sheet.append_rows(rows)
+    with span("sheets", "append_rows"):
+        sheet.append_rows(rows)
+    save_snapshot({sym: _cache[sym] for sym in symbols if sym in _cache}, snapshot_path)
+    # שורות שנלקחו מהמטמון כבר נשמרו בארכיון בסבב שבו נמשכו; כל שורה נשמרת תחת fetched_at שלה
+    append_round("stock", header, [r for r, _ in fetched], path=archive_path,
+                 row_ts=[t for _, t in fetched])
+    symbol_meta.save()
+    if reused:
+        print(f"♻️ {reused} מניות נלקחו מהמטמון (טריות)")
     print(f"💾 נכתבו {len(rows)} שורות חדשות ל-StockData (מלאות)")
 
+# ===== רשימת מעקב (יקום דינמי) =====
+def load_universe(source=None, initial=False):
+    """
+    טוען את רשימת המעקב: source = נתיב לקובץ, או None → טאב Watchlist בגיליון.
+    קובץ חסר: בטעינה הראשונה (initial=True) → ברירת המחדל; בבדיקה חוזרת → FileNotFoundError,
+    כדי שהיקום והמטמון הנוכחיים יישמרו (הקובץ יכול להיעלם לרגע בזמן deploy / שמירה לא אטומית).
+    רק טאב שנוצר עכשיו מאותחל ברשימת ברירת המחדל; טאב קיים וריק = יקום ריק (המשתמש ניקה אותו).
+    הבורסות המפורשות נרשמות באינדקס המטא-דאטה.
+    """
+    if source:
+        universe = load_watchlist_file(source)
+        if universe is None:
+            if not initial:
+                raise FileNotFoundError(f"קובץ רשימת מעקב {source} לא נמצא – נשארים עם הרשימה הנוכחית")
+            print(f"⚠️ קובץ רשימת מעקב {source} לא נמצא – משתמש בברירת המחדל")
+            universe = dict(DEFAULT_WATCHLIST)
+    else:
+        ws, created = open_or_create_sheet(WATCHLIST_TAB)
+        if created:
+            universe = dict(DEFAULT_WATCHLIST)
+            with span("sheets", "append_rows"):
+                ws.append_rows([["Symbol", "Exchange"]] + [[s, e] for s, e in universe.items()])
+            print(f"📝 טאב {WATCHLIST_TAB} נוצר ואותחל ב-{len(universe)} מניות ברירת מחדל")
+        else:
+            with span("sheets", "get_all_values"):
+                rows = ws.get_all_values()
+            universe = parse_watchlist_rows(rows)
+            if not universe:
+                print(f"⚠️ טאב {WATCHLIST_TAB} ריק – אין מניות למעקב")
+
+    for sym, exch in universe.items():
+        symbol_meta.set_exchange(sym, exch, "watchlist")
+    symbol_meta.save()
+    return universe
+
+def apply_universe_change(old, new):
+    """מדפיס את השינוי ומסיר מהמטמון מניות שהוצאו. מחזיר (added, removed)"""
+    added, removed = diff_universe(old, new)
+    for sym in removed:
+        _cache.pop(sym, None)
+    if added:
+        print(f"➕ נוספו לרשימת המעקב: {added}")
+    if removed:
+        print(f"➖ הוסרו מרשימת המעקב: {removed}")
+    return added, removed
+
 # ===== לולאת Poller =====
-def poller_loop(interval_minutes=3):
-    symbols = ["AAPL", "TSLA", "NVDA", "PLX", "POET"]
+def poller_loop(interval_minutes=3, metrics_file=None, watchlist=None, watch_seconds=30):
+    """
+    watchlist = נתיב לקובץ רשימת מעקב, או None לטאב Watchlist.
+    בזמן ההמתנה בין סבבים הרשימה נבדקת כל watch_seconds; שינוי מפעיל סבב מיידי שבו רק
+    המניות החדשות נמשכות מהספקים (השאר טריות במטמון), ומניות שהוסרו יורדות מהמטמון ומ-StockData.
+    """
+    universe = load_universe(watchlist, initial=True)
     print("\n🚀 Poller פועל – יעדכן כל", interval_minutes, "דקות.")
-    print("🔎 רשימת מניות נוכחית:", symbols)
+    print("🔎 רשימת מניות נוכחית:", list(universe))
+
+    # עלייה חמה: רק מניות שה-snapshot שלהן ישן מסבב אחד יימשכו מחדש
+    warm_start()
+    for sym in [s for s in _cache if s not in universe]:
+        _cache.pop(sym)
+    max_age = interval_minutes * 60
 
     while True:
-        update_stockdata(symbols)
+        update_stockdata(list(universe), max_age_seconds=max_age)
+        metrics.dump(metrics_file)
         print("🕒 סבב הסתיים (", time.strftime("%H:%M:%S"), ")")
         print(f"מחכה {interval_minutes} דקות...\n")
-        time.sleep(interval_minutes * 60)
+
+        deadline = time.time() + interval_minutes * 60
+        while time.time() < deadline:
+            time.sleep(max(0.0, min(watch_seconds, deadline - time.time())))
+            try:
+                new_universe = load_universe(watchlist)
+            except Exception as e:
+                print(f"⚠️ שגיאה בקריאת רשימת המעקב: {e}")
+                continue
+            added, removed = apply_universe_change(universe, new_universe)
+            universe = new_universe
+            if added or removed:
+                break
 
 if __name__ == "__main__":
-    poller_loop(interval_minutes=3)
+    parser = argparse.ArgumentParser(description="Poll providers into the StockData sheet")
+    parser.add_argument("--interval", type=float, default=3, help="minutes between rounds")
+    parser.add_argument("--metrics-file", help="dump timing metrics after every round (.prom or .json)")
+    parser.add_argument("--watchlist", help=f"watchlist file (SYMBOL[,EXCHANGE] per line); default: the {WATCHLIST_TAB} tab")
+    parser.add_argument("--watch-seconds", type=float, default=30, help="how often to re-check the watchlist")
+    args = parser.parse_args()
+    poller_loop(interval_minutes=args.interval, metrics_file=args.metrics_file,
+                watchlist=args.watchlist, watch_seconds=args.watch_seconds)
@@ -0,0 +1,76 @@
+import json
+import sqlite3
+import time
+
+# ===== הגדרות =====
+SNAPSHOT_FILE = "poller_snapshot.db"
+SCHEMA_VERSION = 1
+
+# ===== חיבור למסד =====
+def _connect(path):
+    """פותח את קובץ ה-SQLite ומוודא שגרסת הסכמה תואמת (אחרת מאפס את הטבלה)"""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+    if row is None or int(row[0]) != SCHEMA_VERSION:
+        conn.execute("DROP TABLE IF EXISTS snapshot")
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+            (str(SCHEMA_VERSION),)
+        )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS snapshot ("
+        "symbol TEXT PRIMARY KEY, fetched_at REAL NOT NULL, data TEXT NOT NULL)"
+    )
+    conn.commit()
+    return conn
+
+# ===== טעינה ושמירה =====
+def load_snapshot(path=SNAPSHOT_FILE):
+    """
+    טוען את הסבב האחרון שנשמר.
+    מחזיר {symbol: {"fetched_at": epoch, "data": dict}} או {} אם אין קובץ תקין.
+    """
+    try:
+        conn = _connect(path)
+        try:
+            rows = conn.execute("SELECT symbol, fetched_at, data FROM snapshot").fetchall()
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ לא ניתן לטעון snapshot ({path}): {e}")
+        return {}
+
+    cache = {}
+    for symbol, fetched_at, data in rows:
+        try:
+            cache[symbol] = {"fetched_at": fetched_at, "data": json.loads(data)}
+        except json.JSONDecodeError:
+            continue
+    return cache
+
+def save_snapshot(cache, path=SNAPSHOT_FILE):
+    """שומר את כל המטמון כסבב אחד (מחליף את התוכן הקודם בטרנזקציה אחת)"""
+    try:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.execute("DELETE FROM snapshot")
+                conn.executemany(
+                    "INSERT INTO snapshot (symbol, fetched_at, data) VALUES (?, ?, ?)",
+                    [
+                        (sym, entry["fetched_at"], json.dumps(entry["data"], default=str))
+                        for sym, entry in cache.items()
+                    ]
+                )
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ לא ניתן לשמור snapshot ({path}): {e}")
+
+def is_fresh(entry, max_age_seconds, now=None):
+    """האם רשומה במטמון צעירה מ-max_age_seconds"""
+    if not entry:
+        return False
+    now = time.time() if now is None else now
+    return now - entry["fetched_at"] < max_age_seconds
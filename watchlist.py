@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+
+# ===== הגדרות =====
+WATCHLIST_TAB = "Watchlist"
+SYMBOL_META_FILE = "symbol_meta.json"
+
+# היקום הקודם (היה hard-coded ב-poller_loop) – משמש כברירת מחדל וכתוכן ראשוני לטאב Watchlist
+DEFAULT_WATCHLIST = {"AAPL": "NASDAQ", "TSLA": "NASDAQ", "NVDA": "NASDAQ", "PLX": "AMEX", "POET": "AMEX"}
+
+# קודי בורסה של Yahoo (info["exchange"]) → קוד הבורסה של TradingView
+YAHOO_TO_TV_EXCHANGE = {
+    "NMS": "NASDAQ", "NGM": "NASDAQ", "NCM": "NASDAQ", "NAS": "NASDAQ",
+    "NYQ": "NYSE", "NYS": "NYSE",
+    "ASE": "AMEX", "PCX": "AMEX", "AMX": "AMEX",
+}
+
+# ===== קריאת רשימת המעקב =====
+def parse_watchlist_rows(rows):
+    """
+    שורות (מטאב או מקובץ) → {SYMBOL: exchange או None}, בסדר הופעה.
+    עמודה ראשונה = סימבול, עמודה שנייה (רשות) = בורסה. שורת כותרת "Symbol" ושורות # מדולגות.
+    """
+    out = {}
+    for r in rows:
+        if not r:
+            continue
+        sym = str(r[0]).strip().upper()
+        if not sym or sym.startswith("#") or sym == "SYMBOL":
+            continue
+        exch = str(r[1]).strip().upper() if len(r) > 1 and str(r[1]).strip() else None
+        out[sym] = exch
+    return out
+
+def load_watchlist_file(path):
+    """קובץ טקסט: שורה לכל מניה, 'SYMBOL' או 'SYMBOL,EXCHANGE'. None אם הקובץ לא קיים"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return parse_watchlist_rows([line.strip().split(",") for line in f])
+    except FileNotFoundError:
+        return None
+
+def diff_universe(old, new):
+    """(added, removed) בין שתי רשימות מעקב"""
+    added = [s for s in new if s not in old]
+    removed = [s for s in old if s not in new]
+    return added, removed
+
+# ===== אינדקס מטא-דאטה לסימבולים =====
+class SymbolMeta:
+    """
+    אינדקס קבוע (JSON) של מטא-דאטה לכל סימבול – כרגע קוד הבורסה ל-TradingView.
+    הבורסה נקבעת פעם אחת (מרשימת המעקב או מ-Yahoo) ונשמרת, במקום if/elif קשיח.
+    """
+
+    def __init__(self, path=SYMBOL_META_FILE):
+        self.path = path
+        self._data = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._data = {}
+        return self._data
+
+    def get_exchange(self, symbol):
+        with self._lock:
+            return self._load().get(symbol, {}).get("exchange")
+
+    def set_exchange(self, symbol, exchange, source):
+        """קובע בורסה; ערך מפורש מרשימת המעקב גובר, Yahoo רק משלים חוסר"""
+        if not exchange:
+            return
+        with self._lock:
+            entry = self._load().setdefault(symbol, {})
+            if entry.get("exchange") == exchange:
+                return
+            if source == "yahoo" and entry.get("exchange"):
+                return
+            entry.update({"exchange": exchange, "source": source})
+            self._dirty = True
+
+    def resolve_from_yahoo(self, symbol, yahoo_exchange):
+        self.set_exchange(symbol, YAHOO_TO_TV_EXCHANGE.get(yahoo_exchange), "yahoo")
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._data, f, indent=1, sort_keys=True)
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except OSError as e:
+                print(f"⚠️ לא ניתן לשמור {self.path}: {e}")
+
+symbol_meta = SymbolMeta()